@@ -1,28 +1,49 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+from metrics import timed
+from deadline import guarded, respond, edit_message
+from dispatch import outbox
+from decisions import DecisionView, decision_locks, decide, already_decided
+from images import image_checker, gallery_embeds, MAX_IMAGES
 from datetime import datetime
+import store
+import permissions
+from config import DESIGNER_ROLE_ID
 
 # Channel IDs
 QC_CHANNEL_ID = 1342233279050416129  # Quality Control channel
 QC_RESULTS_CHANNEL_ID = 1342224308793114705  # Channel where results (approvals/denials) are sent
 
-# Role ID
-DESIGNER_ROLE_ID = 1342201759111712799  # Designer role
-
 class QualityControl(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Reload every open QC decision in one query so old buttons keep working after a restart
+        self.pending = store.load_pending("qc")
+        self.approval_view = QCApprovalView(bot, self.pending)
+
+    async def cog_unload(self):
+        self.approval_view.stop()
+        await image_checker.close()
 
     @app_commands.command(name="control", description="Submit a design for quality control (Designers only).")
+    @permissions.require_role(DESIGNER_ROLE_ID, "❌ You must be a **Designer** to use this command.")
+    @timed()
     async def control(self, interaction: discord.Interaction, order_id: str, designer: discord.Member):
         """Only Designers can submit a design for quality control."""
-        
-        # Restrict to Designer role
-        if not any(role.id == DESIGNER_ROLE_ID for role in interaction.user.roles):
-            await interaction.response.send_message("❌ You must be a **Designer** to use this command.", ephemeral=True)
+
+        # Check the order registry: the order must belong to this designer and not be approved yet
+        order = store.get_order(order_id)
+        if order and order["designer_id"] != designer.id:
+            await interaction.response.send_message(f"❌ **Order {order_id}** is claimed by <@{order['designer_id']}>, not {designer.mention}.", ephemeral=True)
             return
-        
+        if order and order["status"] == "approved":
+            await interaction.response.send_message(f"⚠️ **Order {order_id}** has already passed Quality Control.", ephemeral=True)
+            return
+        if order and order["status"] == "in_qc":
+            await interaction.response.send_message(f"⚠️ **Order {order_id}** is already waiting for Quality Control.", ephemeral=True)
+            return
+
         # Open an image upload modal
         await interaction.response.send_modal(QCImageUpload(order_id, designer))
 
@@ -34,88 +55,153 @@ class QCImageUpload(discord.ui.Modal, title="Upload QC Images"):
 
     images = discord.ui.TextInput(label="Image Links", placeholder="Paste image URLs (separate multiple links with a comma)", required=True)
 
+    @timed()
+    @guarded()
     async def on_submit(self, interaction: discord.Interaction):
         """Handles image submissions and sends the embed to QC channel."""
 
         # Split multiple image links
         image_urls = [url.strip() for url in self.images.value.split(",") if url.strip()]
         if not image_urls:
-            await interaction.response.send_message("❌ You must provide at least one valid image URL.", ephemeral=True)
+            await respond(interaction, "❌ You must provide at least one valid image URL.", ephemeral=True)
+            return
+        if len(image_urls) > MAX_IMAGES:
+            await respond(interaction, f"❌ Please submit at most {MAX_IMAGES} image links.", ephemeral=True)
             return
 
         # Fetch QC channel
         qc_channel = interaction.guild.get_channel(QC_CHANNEL_ID)
         if not qc_channel:
-            await interaction.response.send_message("❌ Quality Control channel not found.", ephemeral=True)
+            await respond(interaction, "❌ Quality Control channel not found.", ephemeral=True)
+            return
+
+        # Check every link before it reaches reviewers (concurrent, cached, headers/first bytes only)
+        checks = await image_checker.check_all(image_urls)
+        broken = [check for check in checks if not check.ok]
+        if broken:
+            lines = "\n".join(f"• {check.url} — {check.reason}" for check in broken)
+            await respond(interaction, f"❌ Some images could not be used:\n{lines}"[:2000], ephemeral=True)
             return
 
-        # Create QC submission embed
+        # Create QC submission embed with every image as a gallery
         embed = discord.Embed(title="🛠️ Quality Control Submission", color=discord.Color.blue())
         embed.add_field(name="🆔 Order ID", value=self.order_id, inline=True)
         embed.add_field(name="👤 Designer", value=self.designer.mention, inline=True)
         embed.add_field(name="📅 Submitted On", value=f"<t:{int(datetime.utcnow().timestamp())}:F>", inline=False)
-        embed.set_image(url=image_urls[0])  # Show first image
-
-        # Add Approve/Deny buttons
-        view = QCApprovalView(self.designer, self.order_id, interaction.client)
-
-        # Send embed to QC channel
-        await qc_channel.send(embed=embed, view=view)
-        await interaction.response.send_message("✅ Your submission has been sent for Quality Control.", ephemeral=True)
-
-class QCApprovalView(discord.ui.View):
-    def __init__(self, designer, order_id, bot):
-        super().__init__(timeout=None)
-        self.designer = designer
-        self.order_id = order_id
-        self.bot = bot
+        embeds = gallery_embeds(embed, image_urls)
+
+        # Move the order to QC before posting, so a second submission of the same order is turned away
+        # (orders that were never /claim-ed are registered here)
+        claimed, order = store.claim_order(self.order_id, self.designer.id, status="in_qc")
+        if not claimed and not store.set_order_status(self.order_id, "in_qc", expected=("claimed", "denied")):
+            state = "has already passed" if order["status"] == "approved" else "is already waiting for"
+            await respond(interaction, f"⚠️ **Order {self.order_id}** {state} Quality Control.", ephemeral=True)
+            return
 
-    @discord.ui.button(label="Approve", style=discord.ButtonStyle.green)
+        # Add Approve/Deny buttons (shared persistent view)
+        view = interaction.client.get_cog("QualityControl").approval_view
+
+        # Send embed to QC channel and remember what the buttons belong to
+        try:
+            message = await qc_channel.send(embeds=embeds, view=view)
+        except discord.HTTPException as e:
+            # Nothing reached reviewers: put the order back so it can be submitted again
+            if claimed:
+                store.unclaim_order(self.order_id, "in_qc")
+            else:
+                store.set_order_status(self.order_id, order["status"], expected=("in_qc",))
+            print(f"❌ Failed to post QC submission for order {self.order_id}: {e}")
+            await respond(interaction, "❌ Your submission could not be posted to Quality Control. Please try again.", ephemeral=True)
+            return
+        view.add_pending(message, {"designer_id": self.designer.id, "order_id": self.order_id})
+        if claimed:
+            interaction.client.dispatch("order_claimed", order)
+        await respond(interaction, "✅ Your submission has been sent for Quality Control.", ephemeral=True)
+
+class QCApprovalView(DecisionView):
+    """Persistent Approve/Deny buttons shared by every QC submission (state lives in the store)."""
+    kind = "qc"
+
+    @discord.ui.button(label="Approve", style=discord.ButtonStyle.green, custom_id="qc:approve")
+    @timed()
+    @guarded()
     async def approve(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Edit the original message to show it was approved
-        await interaction.message.edit(embed=interaction.message.embeds[0].set_footer(text="✅ Approved"), view=None)
+        # First decision wins; a second click waits for the first edit, then gets a reply from the store
+        async with decision_locks.hold(interaction.message.id):
+            record = self.get_pending(interaction.message.id)
+            won = record is not None and decide(self, interaction.message.id, "qc", "approved", interaction.user.id)[0]
+            if not won:
+                await respond(interaction, already_decided(interaction.message.id, "submission"), ephemeral=True)
+                return
+            # Only a verdict that actually moved the order counts towards the designer's load and denial rate
+            if store.set_order_status(record["order_id"], "approved", expected=("in_qc",)):
+                store.record_qc_result(record["order_id"], record["designer_id"], True)
+                self.bot.dispatch("qc_result", record["order_id"], record["designer_id"], True)
+
+            # Acknowledge by editing the QC message in place; the result post goes through the shared outbox
+            embeds = interaction.message.embeds
+            embeds[0].set_footer(text="✅ Approved")
+            await edit_message(interaction, embeds=embeds, view=None)
 
         # Fetch QC Results channel
         results_channel = interaction.guild.get_channel(QC_RESULTS_CHANNEL_ID)
         if results_channel:
-            await results_channel.send(f"✅ {self.designer.mention} **Your product has passed Quality Control!** 🎉")
+            outbox.send(results_channel, f"✅ <@{record['designer_id']}> **Your product has passed Quality Control!** 🎉")
 
-        await interaction.response.send_message("✅ Design approved.", ephemeral=True)
+        await respond(interaction, "✅ Design approved.", ephemeral=True)
 
-    @discord.ui.button(label="Deny", style=discord.ButtonStyle.red)
+    @discord.ui.button(label="Deny", style=discord.ButtonStyle.red, custom_id="qc:deny")
+    @timed()
     async def deny(self, interaction: discord.Interaction, button: discord.ui.Button):
-        modal = QCDenyModal(self.designer, self.order_id, interaction.message, self.bot)
+        record = self.get_pending(interaction.message.id)
+        if record is None:
+            await interaction.response.send_message(already_decided(interaction.message.id, "submission"), ephemeral=True)
+            return
+
+        modal = QCDenyModal(self, record, interaction.message)
         await interaction.response.send_modal(modal)
 
 class QCDenyModal(discord.ui.Modal, title="Deny Quality Check Submission"):
     reason = discord.ui.TextInput(label="Denial Reason", style=discord.TextStyle.paragraph, required=True)
 
-    def __init__(self, designer, order_id, message, bot):
+    def __init__(self, view, record, message):
         super().__init__()
-        self.designer = designer
-        self.order_id = order_id
+        self.approval_view = view
+        self.record = record
         self.message = message
-        self.bot = bot
 
+    @timed()
+    @guarded()
     async def on_submit(self, interaction: discord.Interaction):
-        embed = self.message.embeds[0]
-        embed.set_footer(text=f"❌ Denied - Reason: {self.reason.value}")
-
-        # Edit the original message to show it was denied
-        await self.message.edit(embed=embed, view=None)
+        # Someone may have decided while this modal was open
+        async with decision_locks.hold(self.message.id):
+            won, _ = decide(self.approval_view, self.message.id, "qc", "denied", interaction.user.id, self.reason.value)
+            if not won:
+                await respond(interaction, already_decided(self.message.id, "submission"), ephemeral=True)
+                return
+            if store.set_order_status(self.record["order_id"], "denied", expected=("in_qc",)):
+                store.record_qc_result(self.record["order_id"], self.record["designer_id"], False)
+                interaction.client.dispatch("qc_result", self.record["order_id"], self.record["designer_id"], False)
+
+            # Acknowledge by editing the QC message in place (the modal was opened from its Deny button)
+            embeds = self.message.embeds
+            embeds[0].set_footer(text=f"❌ Denied - Reason: {self.reason.value}")
+            await edit_message(interaction, embeds=embeds, view=None)
 
         # Fetch QC Results channel
         results_channel = interaction.guild.get_channel(QC_RESULTS_CHANNEL_ID)
         if results_channel:
-            await results_channel.send(f"{self.designer.mention} ❌ Product was Denied, Quality does not meet standards Expected.")
+            outbox.send(results_channel, f"<@{self.record['designer_id']}> ❌ Product was Denied, Quality does not meet standards Expected.")
 
-            # Send Denial Embed
+            # Send Denial Embed (merged with the mention above into one message)
             denial_embed = discord.Embed(title="❌ Quality Check Denied", color=discord.Color.red())
             denial_embed.add_field(name="Reason", value=self.reason.value, inline=False)
-            await results_channel.send(embed=denial_embed)
+            outbox.send(results_channel, embed=denial_embed)
 
-        await interaction.response.send_message("✅ Denial reason sent.", ephemeral=True)
+        await respond(interaction, "✅ Denial reason sent.", ephemeral=True)
 
 # Setup function for bot to load the cog
 async def setup(bot):
-    await bot.add_cog(QualityControl(bot))
\ No newline at end of file
+    cog = QualityControl(bot)
+    await bot.add_cog(cog)
+    bot.add_view(cog.approval_view)
\ No newline at end of file
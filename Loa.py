@@ -1,26 +1,186 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+from metrics import timed
+from deadline import guarded, respond, edit_message, background
+from decisions import DecisionView, decision_locks, decide, already_decided
 from datetime import datetime, timedelta
+import asyncio
+import heapq
+import time
+import store
+import permissions
+from config import DESIGNER_ROLE_ID, LOA_ROLE_ID
+from members import get_member
+from shards import owns_guild
 
-# Role & Channel IDs
-LOA_ROLE_ID = 1342882515676827668  # LOA Role ID
-DESIGNING_TEAM_ROLE_ID = 1342201759111712799  # Only Designers can approve LOA
+# Channel IDs
 APPROVAL_CHANNEL_ID = 1342883804896821270  # Channel where requests are sent
 SERVER_ICON_URL = "https://cdn.discordapp.com/icons/1342198087933755555/your_server_icon.png"  # Update with actual URL
+MAX_SLEEP = 86400  # Re-check the earliest deadline at least daily (guards against clock jumps)
+
+class LOAExpiryScheduler:
+    """Min-heap of active LOA expiries; sleeps until the earliest deadline and removes the LOA role."""
+    def __init__(self, bot):
+        self.bot = bot
+        self.active = {}  # (guild_id, user_id) -> active LOA row
+        self.heap = []  # (end_ts, loa_id, (guild_id, user_id)), stale entries are skipped lazily
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        """Loads active LOAs in one query and starts the expiry loop; overdue ones are expired in one batch."""
+        now = time.time()
+        overdue = []
+        for loa in store.load_active_loas():
+            if not owns_guild(self.bot, loa["guild_id"]):
+                continue  # Another worker process runs this guild's shard
+            if loa["end_ts"] <= now:
+                overdue.append(loa)
+            else:
+                self.active[(loa["guild_id"], loa["user_id"])] = loa
+        self.heap = [(loa["end_ts"], loa["id"], key) for key, loa in self.active.items()]
+        heapq.heapify(self.heap)
+        self.task = asyncio.create_task(self._run(overdue))
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    def add(self, loa):
+        """Schedules an approved LOA (O(log n)); replaces any active LOA for the same member."""
+        key = (loa["guild_id"], loa["user_id"])
+        self.active[key] = loa
+        heapq.heappush(self.heap, (loa["end_ts"], loa["id"], key))
+        if self.heap[0][1] == loa["id"]:
+            self.wakeup.set()  # New earliest deadline
+
+    def remove(self, guild_id, user_id):
+        """Drops a member's active LOA from the schedule; its heap entry is skipped when popped."""
+        return self.active.pop((guild_id, user_id), None)
+
+    def upcoming(self, guild_id, limit=25):
+        """Returns the guild's active LOAs, earliest expiry first."""
+        loas = (loa for loa in self.active.values() if loa["guild_id"] == guild_id)
+        return heapq.nsmallest(limit, loas, key=lambda loa: loa["end_ts"])
+
+    def _is_current(self, entry):
+        loa = self.active.get(entry[2])
+        return loa is not None and loa["id"] == entry[1]
+
+    async def _run(self, overdue):
+        await self.bot.wait_until_ready()
+        if overdue:
+            print(f"⏰ Catching up on {len(overdue)} LOAs that expired while offline")
+            await self.expire(overdue)
+
+        while True:
+            while self.heap and not self._is_current(self.heap[0]):
+                heapq.heappop(self.heap)
+
+            delay = min(self.heap[0][0] - time.time(), MAX_SLEEP) if self.heap else MAX_SLEEP
+            if delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            due = []
+            while self.heap and self.heap[0][0] <= now:
+                entry = heapq.heappop(self.heap)
+                if self._is_current(entry):
+                    due.append(self.active.pop(entry[2]))
+            await self.expire(due)
+
+    async def expire(self, loas):
+        """Marks LOAs as expired, removes the LOA role and lets each member know."""
+        store.finish_loas([loa["id"] for loa in loas], "expired")
+        for loa in loas:
+            self.bot.dispatch("loa_end", loa)
+            await end_member_loa(self.bot, loa, "Your leave of absence has ended. Welcome back!")
+
+async def start_member_loa(guild, record):
+    """Gives an approved requester the LOA role and lets them know by DM."""
+    try:
+        requester = await get_member(guild, record["requester_id"])
+    except discord.HTTPException:
+        requester = None
+
+    # Assign LOA Role
+    try:
+        loa_role = guild.get_role(LOA_ROLE_ID)
+        if loa_role and requester:
+            await requester.add_roles(loa_role)
+    except Exception as e:
+        print(f"❌ Failed to assign LOA role: {e}")
+
+    # Send DM
+    embed = discord.Embed(title="✅ LOA Approved", color=discord.Color.green())
+    embed.set_thumbnail(url=SERVER_ICON_URL)
+    embed.add_field(name="Your LOA has been approved!", value=f"Your leave of absence until <t:{record['end_ts']}:F> has been approved.", inline=False)
+    embed.set_footer(text="Enjoy your time off!")
+
+    try:
+        await requester.send(embed=embed)
+    except:
+        pass
+
+async def end_member_loa(bot, loa, message):
+    """Removes the LOA role from the member and DMs them."""
+    guild = bot.get_guild(loa["guild_id"])
+    if not guild:
+        return
+    try:
+        member = await get_member(guild, loa["user_id"])
+    except discord.HTTPException:
+        return
+
+    try:
+        loa_role = guild.get_role(LOA_ROLE_ID)
+        if loa_role:
+            await member.remove_roles(loa_role)
+    except Exception as e:
+        print(f"❌ Failed to remove LOA role: {e}")
+
+    embed = discord.Embed(title="🏁 LOA Ended", color=discord.Color.blue())
+    embed.set_thumbnail(url=SERVER_ICON_URL)
+    embed.add_field(name="Your LOA is over.", value=message, inline=False)
+
+    try:
+        await member.send(embed=embed)
+    except:
+        pass
 
 class LOARequest(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Reload every open LOA request in one query so old buttons keep working after a restart
+        self.pending = store.load_pending("loa")
+        self.approval_view = LOAApprovalView(bot, self.pending)
+        self.scheduler = LOAExpiryScheduler(bot)
 
-    @app_commands.command(name="loa", description="Request a Leave of Absence (LOA).")
-    async def loa(self, interaction: discord.Interaction, duration: str, reason: str):
+    async def cog_load(self):
+        self.scheduler.start()
+
+    def cog_unload(self):
+        self.approval_view.stop()
+        self.scheduler.stop()
+
+    loa = app_commands.Group(name="loa", description="Leave of Absence (LOA) commands.")
+
+    @loa.command(name="request", description="Request a Leave of Absence (LOA).")
+    @timed()
+    @guarded()
+    async def request(self, interaction: discord.Interaction, duration: str, reason: str):
         """Handles LOA requests, sends them for approval, and processes responses."""
 
         # Validate duration format (e.g., 5d, 2m, 1y)
         unit = duration[-1].lower()
         if unit not in ["d", "m", "y"] or not duration[:-1].isdigit():
-            await interaction.response.send_message("❌ Invalid format! Use `d` for days, `m` for months, or `y` for years. Example: `5d`", ephemeral=True)
+            await respond(interaction, "❌ Invalid format! Use `d` for days, `m` for months, or `y` for years. Example: `5d`", ephemeral=True)
             return
         
         amount = int(duration[:-1])
@@ -44,78 +204,129 @@ class LOARequest(commands.Cog):
         embed.add_field(name="Reason", value=reason, inline=False)
         embed.add_field(name="Requested On", value=request_time, inline=True)
 
-        # Add approval buttons
-        view = LOAApprovalView(interaction.user, reason, duration, end_time, self.bot)
+        # Add approval buttons (shared persistent view)
+        view = self.approval_view
 
-        # Send to approval channel
+        # Send to approval channel and remember what the buttons belong to
         channel = self.bot.get_channel(APPROVAL_CHANNEL_ID)
         if channel:
-            await channel.send(embed=embed, view=view)
-            await interaction.response.send_message("✅ Your LOA request has been submitted for approval.", ephemeral=True)
+            message = await channel.send(embed=embed, view=view)
+            view.add_pending(message, {
+                "requester_id": interaction.user.id,
+                "reason": reason,
+                "duration": duration,
+                "end_ts": int(end_date.timestamp()),
+            })
+            await respond(interaction, "✅ Your LOA request has been submitted for approval.", ephemeral=True)
         else:
-            await interaction.response.send_message("❌ Failed to find the approval channel.", ephemeral=True)
-
-class LOAApprovalView(discord.ui.View):
-    def __init__(self, requester, reason, duration, end_time, bot):
-        super().__init__(timeout=None)
-        self.requester = requester
-        self.reason = reason
-        self.duration = duration
-        self.end_time = end_time
-        self.bot = bot
+            await respond(interaction, "❌ Failed to find the approval channel.", ephemeral=True)
+
+    @loa.command(name="list", description="List active LOAs and when they end.")
+    @timed()
+    async def list_loas(self, interaction: discord.Interaction):
+        """Lists active LOAs from the expiry scheduler's index."""
+        loas = self.scheduler.upcoming(interaction.guild.id)
+        if not loas:
+            await interaction.response.send_message("📭 No one is currently on LOA.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="🌴 Active LOAs", color=discord.Color.orange())
+        embed.description = "\n".join(f"<@{loa['user_id']}> — until <t:{loa['end_ts']}:F> (<t:{loa['end_ts']}:R>)" for loa in loas)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @loa.command(name="end", description="End an active LOA early.")
+    @app_commands.describe(member="Whose LOA to end (Designers only, defaults to yourself)")
+    @timed()
+    async def end_loa(self, interaction: discord.Interaction, member: discord.Member = None):
+        """Ends an LOA early, removes the LOA role and notifies the member."""
+        member = member or interaction.user
+        if member.id != interaction.user.id and not permissions.has_role(interaction.user, DESIGNER_ROLE_ID):
+            await interaction.response.send_message("❌ You do not have permission to end other members' LOAs.", ephemeral=True)
+            return
+
+        loa = self.scheduler.remove(interaction.guild.id, member.id)
+        if not loa:
+            await interaction.response.send_message(f"⚠️ {member.mention} is not on LOA.", ephemeral=True)
+            return
 
-    @discord.ui.button(label="Approve", style=discord.ButtonStyle.green)
+        store.finish_loas([loa["id"]], "ended")
+        self.bot.dispatch("loa_end", loa)
+        await interaction.response.send_message(f"✅ Ended {member.mention}'s LOA.", ephemeral=True)
+        background(end_member_loa(self.bot, loa, f"Your leave of absence was ended early by {interaction.user.mention}."))
+
+class LOAApprovalView(DecisionView):
+    """Persistent Approve/Deny buttons shared by every LOA request (state lives in the store)."""
+    kind = "loa"
+
+    @discord.ui.button(label="Approve", style=discord.ButtonStyle.green, custom_id="loa:approve")
+    @timed()
+    @guarded()
     async def approve(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Check if user has the Designing Team role
-        if not any(role.id == DESIGNING_TEAM_ROLE_ID for role in interaction.user.roles):
-            await interaction.response.send_message("❌ You do not have permission to approve LOAs.", ephemeral=True)
+        # Only Designers can approve LOAs
+        if not permissions.has_role(interaction.user, DESIGNER_ROLE_ID):
+            await respond(interaction, "❌ You do not have permission to approve LOAs.", ephemeral=True)
             return
-        
-        # Assign LOA Role
-        try:
-            loa_role = interaction.guild.get_role(LOA_ROLE_ID)
-            if loa_role:
-                await self.requester.add_roles(loa_role)
-        except Exception as e:
-            print(f"❌ Failed to assign LOA role: {e}")
-
-        # Send DM
-        embed = discord.Embed(title="✅ LOA Approved", color=discord.Color.green())
-        embed.set_thumbnail(url=SERVER_ICON_URL)
-        embed.add_field(name="Your LOA has been approved!", value=f"Your leave of absence until {self.end_time} has been approved.", inline=False)
-        embed.set_footer(text="Enjoy your time off!")
 
-        try:
-            await self.requester.send(embed=embed)
-        except:
-            pass
+        # First decision wins; a second click waits for the first edit, then gets a reply from the store
+        async with decision_locks.hold(interaction.message.id):
+            record = self.get_pending(interaction.message.id)
+            won = record is not None and decide(self, interaction.message.id, "loa", "approved", interaction.user.id)[0]
+            if not won:
+                await respond(interaction, already_decided(interaction.message.id, "LOA request"), ephemeral=True)
+                return
+
+            # Schedule the automatic role removal at the real expiry time
+            loa = store.add_loa(interaction.guild.id, record["requester_id"], record["reason"], record["end_ts"])
+            self.bot.get_cog("LOARequest").scheduler.add(loa)
+            self.bot.dispatch("loa_start", loa)
 
-        await interaction.message.edit(embed=interaction.message.embeds[0].set_footer(text="✅ Approved"), view=None)
-        await interaction.response.send_message("✅ LOA request approved.", ephemeral=True)
+            # Acknowledge by editing the request in place; the role and DM follow in the background
+            await edit_message(interaction, embed=interaction.message.embeds[0].set_footer(text="✅ Approved"), view=None)
+        background(start_member_loa(interaction.guild, record))
+        await respond(interaction, "✅ LOA request approved.", ephemeral=True)
 
-    @discord.ui.button(label="Deny", style=discord.ButtonStyle.red)
+    @discord.ui.button(label="Deny", style=discord.ButtonStyle.red, custom_id="loa:deny")
+    @timed()
     async def deny(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not any(role.id == DESIGNING_TEAM_ROLE_ID for role in interaction.user.roles):
+        if not permissions.has_role(interaction.user, DESIGNER_ROLE_ID):
             await interaction.response.send_message("❌ You do not have permission to deny LOAs.", ephemeral=True)
             return
 
-        modal = LOADenyModal(self.requester, interaction.message)
+        record = self.get_pending(interaction.message.id)
+        if record is None:
+            await interaction.response.send_message(already_decided(interaction.message.id, "LOA request"), ephemeral=True)
+            return
+
+        modal = LOADenyModal(self, record, interaction.message)
         await interaction.response.send_modal(modal)
 
 class LOADenyModal(discord.ui.Modal, title="Deny LOA Request"):
     reason = discord.ui.TextInput(label="Denial Reason", style=discord.TextStyle.paragraph, required=True)
 
-    def __init__(self, requester, message):
+    def __init__(self, view, record, message):
         super().__init__()
-        self.requester = requester
+        self.approval_view = view
+        self.record = record
         self.message = message
 
+    @timed()
+    @guarded()
     async def on_submit(self, interaction: discord.Interaction):
-        embed = self.message.embeds[0]
-        embed.set_footer(text=f"❌ Denied - Reason: {self.reason.value}")
+        # Someone may have decided while this modal was open
+        async with decision_locks.hold(self.message.id):
+            won, _ = decide(self.approval_view, self.message.id, "loa", "denied", interaction.user.id, self.reason.value)
+            if not won:
+                await respond(interaction, already_decided(self.message.id, "LOA request"), ephemeral=True)
+                return
 
-        await self.message.edit(embed=embed, view=None)
+            # Acknowledge by editing the request in place (the modal was opened from its Deny button)
+            embed = self.message.embeds[0]
+            embed.set_footer(text=f"❌ Denied - Reason: {self.reason.value}")
+            await edit_message(interaction, embed=embed, view=None)
+        background(self.notify_requester(interaction.guild))
+        await respond(interaction, "✅ LOA request denied.", ephemeral=True)
 
+    async def notify_requester(self, guild):
         # Send DM to user
         embed_dm = discord.Embed(title="❌ LOA Denied", color=discord.Color.red())
         embed_dm.set_thumbnail(url=SERVER_ICON_URL)
@@ -123,12 +334,13 @@ class LOADenyModal(discord.ui.Modal, title="Deny LOA Request"):
         embed_dm.set_footer(text="Contact management for further details.")
 
         try:
-            await self.requester.send(embed=embed_dm)
+            requester = await get_member(guild, self.record["requester_id"])
+            await requester.send(embed=embed_dm)
         except:
             pass
 
-        await interaction.response.send_message("✅ LOA request denied.", ephemeral=True)
-
 # Setup function for bot to load the cog
 async def setup(bot):
-    await bot.add_cog(LOARequest(bot))
\ No newline at end of file
+    cog = LOARequest(bot)
+    await bot.add_cog(cog)
+    bot.add_view(cog.approval_view)
\ No newline at end of file
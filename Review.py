@@ -1,81 +1,192 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+from metrics import timed
+from deadline import guarded, respond, edit_message
+from dispatch import outbox
+import store
+from extensions import lazy_import
+
+backfill = lazy_import("backfill")  # History import code only runs the first time /ratings-backfill is used
 
 # Review Channel ID
 REVIEW_CHANNEL_ID = 1342201735992840242  # Update with correct channel ID
 
+REVIEW_TIMEOUT = 300  # Seconds an unfinished review form stays open (well inside the 15 minute interaction token)
+
+# Product types (name, emoji)
+PRODUCT_TYPES = [
+    ("Livery", "🎨"),
+    ("ELS", "🚔"),
+    ("Discord", "💻"),
+    ("Clothing", "👕"),
+    ("Graphics", "🖼️"),
+]
+
+def star_bar(count, total, width=10):
+    filled = round(width * count / total) if total else 0
+    return "█" * filled + "░" * (width - filled)
+
 class ReviewCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.backfilling = False
 
     @app_commands.command(name="review", description="Submit a review for a designer.")
-    @app_commands.describe(designer="Select the designer", reviewer="Select yourself (the reviewer)", notes="Add any additional comments")
-    async def review(self, interaction: discord.Interaction, designer: discord.Member, reviewer: discord.Member, notes: str = "No additional notes provided."):
-        """Starts the review process by opening a dropdown for product type."""
-        view = ReviewDropdown(self.bot, designer, reviewer, notes)
-        await interaction.response.send_message("📌 Select the product type:", view=view, ephemeral=True)
-
-class ReviewDropdown(discord.ui.View):
-    def __init__(self, bot, designer, reviewer, notes):
-        super().__init__(timeout=None)
+    @app_commands.describe(designer="Select the designer", reviewer="Select yourself (the reviewer)", notes="Add any additional comments", product="Product type (can also be picked in the form)", stars="Star rating (can also be picked in the form)")
+    @app_commands.choices(
+        product=[app_commands.Choice(name=f"{emoji} {name}", value=name) for name, emoji in PRODUCT_TYPES],
+        stars=[app_commands.Choice(name="⭐" * stars, value=stars) for stars in range(1, 6)],
+    )
+    @timed()
+    async def review(self, interaction: discord.Interaction, designer: discord.Member, reviewer: discord.Member, notes: str = "No additional notes provided.", product: app_commands.Choice[str] = None, stars: app_commands.Choice[int] = None):
+        """Opens the review form (product, stars and Submit in one message that is edited in place)."""
+        view = ReviewForm(self.bot, interaction, designer, reviewer, notes, product.value if product else None, str(stars.value) if stars else None)
+        await interaction.response.send_message(f"📝 Reviewing {designer.mention}: pick the product type and a star rating, then press **Submit**.", view=view, ephemeral=True)
+
+    @app_commands.command(name="ratings", description="Show a designer's review ratings.")
+    @app_commands.describe(designer="Select the designer")
+    @timed()
+    async def ratings(self, interaction: discord.Interaction, designer: discord.Member):
+        """Shows a designer's rating aggregates per product type."""
+        ratings = store.get_ratings(designer.id)
+        overall = ratings.get(store.ALL_PRODUCTS)
+        if not overall:
+            await interaction.response.send_message(f"📭 {designer.mention} has no reviews yet.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title=f"⭐ Ratings for {designer.display_name}", color=discord.Color.gold())
+        recent = f"{overall['recent_sum'] / overall['recent_count']:.2f} ({overall['recent_count']})" if overall["recent_count"] else "—"
+        embed.description = (
+            f"**Average:** {overall['sum'] / overall['count']:.2f} from {overall['count']} reviews\n"
+            f"**Last {store.RATING_WINDOW_DAYS} days:** {recent}\n\n"
+            + "\n".join(f"{stars}⭐ {star_bar(overall[f's{stars}'], overall['count'])} {overall[f's{stars}']}" for stars in range(5, 0, -1))
+        )
+        for product, emoji in PRODUCT_TYPES:
+            totals = ratings.get(product)
+            if totals:
+                embed.add_field(name=f"{emoji} {product}", value=f"{totals['sum'] / totals['count']:.2f} ({totals['count']})", inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="leaderboard", description="Show the top rated designers.")
+    @app_commands.describe(product="Only count reviews for this product type")
+    @app_commands.choices(product=[app_commands.Choice(name=name, value=name) for name, _ in PRODUCT_TYPES])
+    @timed()
+    async def leaderboard(self, interaction: discord.Interaction, product: app_commands.Choice[str] = None):
+        """Shows the top 10 designers by average rating."""
+        product_name = product.value if product else store.ALL_PRODUCTS
+        top = store.top_rated(product_name)
+        if not top:
+            await interaction.response.send_message("📭 No reviews yet.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title=f"🏆 Top Designers ({product_name})", color=discord.Color.gold())
+        embed.description = "\n".join(
+            f"**{rank}.** <@{row['designer_id']}> — {row['average']:.2f}⭐ ({row['count']} reviews)" for rank, row in enumerate(top, start=1)
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="ratings-backfill", description="Import existing reviews from the review channel (Admins only).")
+    @app_commands.default_permissions(manage_guild=True)
+    @timed()
+    async def ratings_backfill(self, interaction: discord.Interaction):
+        """Streams the review channel history into the ratings store, resuming from the last checkpoint."""
+        if self.backfilling:
+            await interaction.response.send_message("⏳ A backfill is already running.", ephemeral=True)
+            return
+
+        review_channel = self.bot.get_channel(REVIEW_CHANNEL_ID)
+        if not review_channel:
+            await interaction.response.send_message("❌ Review channel not found.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        self.backfilling = True
+        try:
+            scanned, imported = await backfill.backfill_ratings(self.bot, review_channel)
+        finally:
+            self.backfilling = False
+
+        await interaction.followup.send(f"✅ Backfill complete: scanned {scanned} messages, imported {imported} reviews.", ephemeral=True)
+
+class ReviewForm(discord.ui.View):
+    """The whole review in one ephemeral message: product and star selects plus Submit, edited in place."""
+    def __init__(self, bot, interaction, designer, reviewer, notes, product=None, stars=None):
+        super().__init__(timeout=REVIEW_TIMEOUT)
         self.bot = bot
-        self.designer = designer
-        self.reviewer = reviewer
+        self.interaction = interaction  # The /review interaction; its token edits the form when it expires
+        self.designer_id = designer.id
+        self.reviewer_id = reviewer.id
         self.notes = notes
+        self.product = product
+        self.stars = stars
+        self.submitted = False
+        self.refresh()
+
+    def refresh(self):
+        """Keeps the chosen options selected across edits and enables Submit once both are chosen."""
+        for option in self.select_product.options:
+            option.default = option.value == self.product
+        for option in self.select_stars.options:
+            option.default = option.value == self.stars
+        self.submit.disabled = not (self.product and self.stars)
 
     @discord.ui.select(
         placeholder="Select Product Type",
-        options=[
-            discord.SelectOption(label="Livery", emoji="🎨"),
-            discord.SelectOption(label="ELS", emoji="🚔"),
-            discord.SelectOption(label="Discord", emoji="💻"),
-            discord.SelectOption(label="Clothing", emoji="👕"),
-            discord.SelectOption(label="Graphics", emoji="🖼️")
-        ]
+        options=[discord.SelectOption(label=name, emoji=emoji) for name, emoji in PRODUCT_TYPES],
+        row=0,
     )
+    @timed()
     async def select_product(self, interaction: discord.Interaction, select: discord.ui.Select):
-        product = select.values[0]
-        view = ReviewStars(self.bot, self.designer, self.reviewer, product, self.notes)
-        await interaction.response.send_message(f"📌 You selected **{product}**. Now choose a star rating:", view=view, ephemeral=True)
-
-class ReviewStars(discord.ui.View):
-    def __init__(self, bot, designer, reviewer, product, notes):
-        super().__init__(timeout=None)
-        self.bot = bot
-        self.designer = designer
-        self.reviewer = reviewer
-        self.product = product
-        self.notes = notes
+        self.product = select.values[0]
+        self.refresh()
+        await interaction.response.edit_message(view=self)
 
     @discord.ui.select(
         placeholder="Select Star Rating",
-        options=[
-            discord.SelectOption(label="⭐", value="1"),
-            discord.SelectOption(label="⭐⭐", value="2"),
-            discord.SelectOption(label="⭐⭐⭐", value="3"),
-            discord.SelectOption(label="⭐⭐⭐⭐", value="4"),
-            discord.SelectOption(label="⭐⭐⭐⭐⭐", value="5"),
-        ]
+        options=[discord.SelectOption(label="⭐" * stars, value=str(stars)) for stars in range(1, 6)],
+        row=1,
     )
+    @timed()
     async def select_stars(self, interaction: discord.Interaction, select: discord.ui.Select):
-        stars = select.values[0]
+        self.stars = select.values[0]
+        self.refresh()
+        await interaction.response.edit_message(view=self)
+
+    @discord.ui.button(label="Submit", style=discord.ButtonStyle.green, row=2, disabled=True)
+    @timed()
+    @guarded()
+    async def submit(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.submitted:
+            await respond(interaction, "⚠️ This review was already submitted.", ephemeral=True)
+            return
+        review_channel = self.bot.get_channel(REVIEW_CHANNEL_ID)
+        if not review_channel:
+            await respond(interaction, "❌ Review channel not found.", ephemeral=True)
+            return
+        self.submitted = True
+        self.stop()
 
         # Create Review Embed
         embed = discord.Embed(title="🌟 New Review Submitted", color=discord.Color.gold())
-        embed.add_field(name="👤 Designer", value=self.designer.mention, inline=True)
-        embed.add_field(name="📝 Reviewer", value=self.reviewer.mention, inline=True)
+        embed.add_field(name="👤 Designer", value=f"<@{self.designer_id}>", inline=True)
+        embed.add_field(name="📝 Reviewer", value=f"<@{self.reviewer_id}>", inline=True)
         embed.add_field(name="📌 Product Type", value=self.product, inline=False)
-        embed.add_field(name="⭐ Rating", value=stars, inline=True)
+        embed.add_field(name="⭐ Rating", value=self.stars, inline=True)
         embed.add_field(name="🗒️ Notes", value=self.notes, inline=False)
 
-        # Send Embed to Review Channel
-        review_channel = self.bot.get_channel(REVIEW_CHANNEL_ID)
-        if review_channel:
-            await review_channel.send(embed=embed)
-            await interaction.response.send_message("✅ Review submitted successfully!", ephemeral=True)
-        else:
-            await interaction.response.send_message("❌ Review channel not found.", ephemeral=True)
+        # Acknowledge by turning the form into the confirmation, then post (reviews submitted close together share one message)
+        await edit_message(interaction, content="✅ Review submitted successfully!", view=None)
+        message, position = await outbox.send(review_channel, embed=embed)
+        store.record_review(message.id, position, self.designer_id, self.reviewer_id, self.product, int(self.stars), message.created_at.timestamp())
+
+    async def on_timeout(self):
+        # Abandoned forms say so instead of leaving dead selects behind; discord.py drops the view itself
+        try:
+            await self.interaction.edit_original_response(content="⌛ This review form expired. Run `/review` again to leave a review.", view=None)
+        except discord.HTTPException:
+            pass
+        self.interaction = None
 
 # Setup function for bot to load the cog
 async def setup(bot):
@@ -0,0 +1,279 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+import asyncio
+import heapq
+import itertools
+import time
+from metrics import timed
+from deadline import guarded, respond
+from dispatch import outbox
+import store
+import permissions
+from members import member_cache, CACHE_MODE
+from config import DESIGNER_ROLE_ID, LOA_ROLE_ID, ORDER_LOG_CHANNEL_ID
+from Review import PRODUCT_TYPES
+
+# 🔹 Assignment Weights (lower score = better candidate)
+LOAD_WEIGHT = 1.0  # Per open order
+DENIAL_WEIGHT = 3.0  # Times the (smoothed) recent QC denial rate, 0..1
+SPECIALTY_WEIGHT = 1.0  # Times how far the product's average rating is above 3 stars, scaled by review count
+SPECIALTY_REVIEWS = 10  # Reviews needed before a specialty counts fully
+REBUILD_EVERY = 86400  # Seconds between full rebuilds (rolls the QC window and picks up new reviews)
+QUEUE_SIZE = 15  # Designers shown in /queue
+
+class DesignerLoad:
+    """Everything that goes into one designer's score."""
+    def __init__(self, designer_id, open_orders=0, passed=0, failed=0, ratings=None, on_loa=False):
+        self.designer_id = designer_id
+        self.open_orders = open_orders
+        self.passed = passed
+        self.failed = failed
+        self.ratings = ratings or {}  # product -> (review count, star sum)
+        self.on_loa = on_loa
+
+    def denial_rate(self):
+        # Smoothed so one early denial doesn't bury a new designer
+        return (self.failed + 1) / (self.passed + self.failed + 2)
+
+    def specialty(self, product):
+        count, total = self.ratings.get(product, (0, 0))
+        if not count:
+            return 0.0
+        return (total / count - 3.0) * min(count, SPECIALTY_REVIEWS) / SPECIALTY_REVIEWS
+
+    def score(self, product):
+        return self.open_orders * LOAD_WEIGHT + self.denial_rate() * DENIAL_WEIGHT - self.specialty(product) * SPECIALTY_WEIGHT
+
+class AssignmentQueue:
+    """One min-heap of designers per product; changed designers are re-pushed and stale entries skipped on pop."""
+    def __init__(self, products):
+        self.products = list(products)
+        self.designers = {}  # designer id -> DesignerLoad
+        self.current = {}  # designer id -> seq of their live heap entries
+        self.heaps = {product: [] for product in self.products}  # product -> [(score, seq, designer id)]
+        self.seq = itertools.count()
+
+    def rebuild(self, designers):
+        """Replaces every heap in O(n) per product."""
+        self.designers = {designer.designer_id: designer for designer in designers}
+        self.current = {designer_id: next(self.seq) for designer_id in self.designers}
+        for product in self.products:
+            heap = [(designer.score(product), self.current[designer.designer_id], designer.designer_id)
+                    for designer in self.designers.values() if not designer.on_loa]
+            heapq.heapify(heap)
+            self.heaps[product] = heap
+
+    def add(self, designer):
+        """Adds or replaces one designer."""
+        self.designers[designer.designer_id] = designer
+        self.update(designer)
+
+    def update(self, designer):
+        """Re-scores one designer: O(log n) per product heap. Designers on LOA only get their old entries invalidated."""
+        seq = self.current[designer.designer_id] = next(self.seq)
+        if designer.on_loa:
+            return
+        for product in self.products:
+            heap = self.heaps[product]
+            heapq.heappush(heap, (designer.score(product), seq, designer.designer_id))
+            if len(heap) > 4 * len(self.designers) + 16:
+                self._compact(product)
+
+    def remove(self, designer_id):
+        self.designers.pop(designer_id, None)
+        self.current.pop(designer_id, None)
+
+    def best(self, product):
+        """Best available designer for a product (amortized O(log n)), or None."""
+        heap = self.heaps[product]
+        while heap:
+            _, seq, designer_id = heap[0]
+            if self.current.get(designer_id) == seq:
+                return self.designers[designer_id]
+            heapq.heappop(heap)
+        return None
+
+    def _compact(self, product):
+        self.heaps[product] = [entry for entry in self.heaps[product] if self.current.get(entry[2]) == entry[1]]
+        heapq.heapify(self.heaps[product])
+
+class Assignment(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.queue = AssignmentQueue([name for name, _ in PRODUCT_TYPES] + [store.ALL_PRODUCTS])
+        self.task = None
+
+    async def cog_load(self):
+        self.task = asyncio.create_task(self._run())
+
+    def cog_unload(self):
+        if self.task:
+            self.task.cancel()
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            await self.rebuild()
+            await asyncio.sleep(REBUILD_EVERY)
+
+    async def current_designers(self):
+        """Members holding the Designer role right now, or None if no guild could be read."""
+        members, found = [], False
+        for guild in self.bot.guilds:
+            if CACHE_MODE == "lean":
+                # The lean cache only knows members who interacted: page through the guild once instead
+                try:
+                    fetched = [member async for member in guild.fetch_members(limit=None) if permissions.has_role(member, DESIGNER_ROLE_ID)]
+                except discord.HTTPException as e:
+                    print(f"⚠️ Could not fetch the members of {guild.id} for the assignment queue: {e}")
+                    continue
+                member_cache.replace_staff(guild.id, fetched)
+                members.extend(fetched)
+                found = True
+            else:
+                role = guild.get_role(DESIGNER_ROLE_ID)
+                if role:
+                    members.extend(role.members)
+                    found = True
+        return members if found else None
+
+    async def rebuild(self):
+        """Loads designers, open orders, recent QC results, ratings and active LOAs in a few queries."""
+        members = await self.current_designers()
+        since = int(time.time()) - store.RATING_WINDOW_DAYS * 86400
+        loads = store.designer_loads(since)
+        ratings = store.product_ratings()
+        on_loa = {loa["user_id"] for loa in store.load_active_loas()}
+
+        # Only current designers get new work
+        if members is None:
+            # No member list at all: everyone the store has seen working
+            designer_ids = set(loads)
+        else:
+            designer_ids = {member.id for member in members}
+            on_loa.update(member.id for member in members if permissions.has_role(member, LOA_ROLE_ID))
+        designers = []
+        for designer_id in designer_ids:
+            load = loads.get(designer_id, {})
+            designers.append(DesignerLoad(designer_id, load.get("open", 0), load.get("passed", 0), load.get("failed", 0), ratings.get(designer_id), designer_id in on_loa))
+        self.queue.rebuild(designers)
+
+    def add_designer(self, member):
+        """Queues someone who just turned out to be a designer, with their orders, QC results, ratings and LOA loaded first."""
+        since = int(time.time()) - store.RATING_WINDOW_DAYS * 86400
+        load = store.designer_loads(since, member.id).get(member.id, {})
+        ratings = store.product_ratings(member.id).get(member.id)
+        on_loa = permissions.has_role(member, LOA_ROLE_ID) or any(loa["user_id"] == member.id for loa in store.load_active_loas())
+        self.queue.add(DesignerLoad(member.id, load.get("open", 0), load.get("passed", 0), load.get("failed", 0), ratings, on_loa))
+
+    def check_member(self, member):
+        """Brings the queue in line with a member's current roles."""
+        if not permissions.has_role(member, DESIGNER_ROLE_ID):
+            self.queue.remove(member.id)
+        elif member.id not in self.queue.designers:
+            self.add_designer(member)
+        else:
+            self.set_on_loa(member.id, permissions.has_role(member, LOA_ROLE_ID))
+
+    # Incremental updates (custom events dispatched by the other cogs)
+    # Only designers already in the queue are updated; anyone else waits for a rebuild or a role change
+    @commands.Cog.listener()
+    async def on_order_claimed(self, order):
+        designer = self.queue.designers.get(order["designer_id"])
+        if designer is None:
+            return
+        designer.open_orders += 1
+        self.queue.update(designer)
+
+    @commands.Cog.listener()
+    async def on_qc_result(self, order_id, designer_id, passed):
+        designer = self.queue.designers.get(designer_id)
+        if designer is None:
+            return
+        if passed:
+            designer.passed += 1
+            designer.open_orders = max(0, designer.open_orders - 1)
+        else:
+            designer.failed += 1
+        self.queue.update(designer)
+
+    @commands.Cog.listener()
+    async def on_loa_start(self, loa):
+        self.set_on_loa(loa["user_id"], True)
+
+    @commands.Cog.listener()
+    async def on_loa_end(self, loa):
+        self.set_on_loa(loa["user_id"], False)
+
+    def set_on_loa(self, designer_id, on_loa):
+        # Anyone can take an LOA; only designers are in the queue
+        designer = self.queue.designers.get(designer_id)
+        if designer and designer.on_loa != on_loa:
+            designer.on_loa = on_loa
+            self.queue.update(designer)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        # Designer/LOA roles changed by hand (only fires for cached members; interactions and rebuilds catch the rest)
+        if before.roles != after.roles:
+            self.check_member(after)
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        # Every interaction carries the member's current roles, which the lean cache has no other way to see
+        if interaction.guild_id is not None:
+            self.check_member(interaction.user)
+
+    @app_commands.command(name="assign", description="Assign an order to the best available designer.")
+    @app_commands.describe(order_id="The ID of the order to assign.", product="What the order is for")
+    @app_commands.choices(product=[app_commands.Choice(name=f"{emoji} {name}", value=name) for name, emoji in PRODUCT_TYPES])
+    @permissions.require_role(DESIGNER_ROLE_ID, "❌ You must be a **Designer** to assign orders.")
+    @timed()
+    @guarded(ephemeral=False)
+    async def assign(self, interaction: discord.Interaction, order_id: str, product: app_commands.Choice[str] = None):
+        """Picks the least loaded, most reliable designer for the product and claims the order for them."""
+        product_name = product.value if product else store.ALL_PRODUCTS
+        designer = self.queue.best(product_name)
+        if designer is None:
+            return await respond(interaction, "⚠️ No designers are available right now.", ephemeral=True)
+
+        claimed, order = store.claim_order(order_id, designer.designer_id, interaction.channel.id, product=product.value if product else None)
+        if not claimed:
+            return await respond(interaction, f"❌ **Order {order_id}** is already claimed by <@{order['designer_id']}>.", ephemeral=True)
+        # Count it before the next await so concurrent /assign calls see the new load
+        await self.on_order_claimed(order)
+
+        embed = discord.Embed(title="📌 Order Assigned", color=discord.Color.green())
+        embed.add_field(name="Order ID", value=order_id, inline=False)
+        embed.add_field(name="Assigned To", value=f"<@{designer.designer_id}>", inline=False)
+        embed.add_field(name="Product", value=product.name if product else "Any", inline=False)
+        embed.set_footer(text=f"{designer.open_orders} open orders | {designer.denial_rate():.0%} recent QC denials")
+        await respond(interaction, embed=embed)
+
+        log_channel = interaction.guild.get_channel(ORDER_LOG_CHANNEL_ID)
+        if log_channel:
+            outbox.send(log_channel, f"📌 **Order Assigned**: **Order {order_id}** went to <@{designer.designer_id}> (assigned by {interaction.user.mention}).")
+
+    @app_commands.command(name="queue", description="Show each designer's current load.")
+    @timed()
+    async def show_queue(self, interaction: discord.Interaction):
+        """Lists designers by open orders, with recent QC denial rate, best product and LOA status."""
+        designers = sorted(self.queue.designers.values(), key=lambda d: (d.on_loa, d.open_orders, d.denial_rate()))
+        if not designers:
+            return await interaction.response.send_message("📭 No designers found.", ephemeral=True)
+
+        lines = []
+        for designer in designers[:QUEUE_SIZE]:
+            best = max(PRODUCT_TYPES, key=lambda product: designer.specialty(product[0]))
+            specialty = f" | {best[1]} {best[0]}" if designer.specialty(best[0]) > 0 else ""
+            status = "🌴 On LOA" if designer.on_loa else f"{designer.open_orders} open"
+            lines.append(f"<@{designer.designer_id}> — {status} | {designer.denial_rate():.0%} denied{specialty}")
+        embed = discord.Embed(title="📊 Designer Queue", description="\n".join(lines), color=discord.Color.blurple())
+        if len(designers) > QUEUE_SIZE:
+            embed.set_footer(text=f"+{len(designers) - QUEUE_SIZE} more designers")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# Setup function for bot to load the cog
+async def setup(bot):
+    await bot.add_cog(Assignment(bot))
\ No newline at end of file
@@ -0,0 +1,41 @@
+import re
+import discord
+import store
+
+# 🔹 Ratings Backfill (loaded lazily by the Review cog on first use)
+REVIEW_EMBED_TITLE = "🌟 New Review Submitted"
+CHECKPOINT_EVERY = 100  # Messages between saved backfill checkpoints
+
+MENTION_PATTERN = re.compile(r"<@!?(\d+)>")
+
+def parse_review_embed(embed):
+    """Parses a review embed posted by ReviewForm back into (designer_id, reviewer_id, product, stars), or None."""
+    if embed.title != REVIEW_EMBED_TITLE:
+        return None
+    fields = {field.name: field.value for field in embed.fields}
+    designer = MENTION_PATTERN.search(fields.get("👤 Designer", ""))
+    reviewer = MENTION_PATTERN.search(fields.get("📝 Reviewer", ""))
+    stars = fields.get("⭐ Rating", "")
+    if not designer or not stars.isdigit() or not 1 <= int(stars) <= 5:
+        return None
+    return int(designer.group(1)), int(reviewer.group(1)) if reviewer else None, fields.get("📌 Product Type", "Unknown"), int(stars)
+
+async def backfill_ratings(bot, review_channel):
+    """Streams the review channel history into the ratings store, resuming from the last checkpoint. Returns (scanned, imported)."""
+    checkpoint_key = f"ratings_backfill:{review_channel.id}"
+    checkpoint = store.get_value(checkpoint_key)
+    after = discord.Object(id=int(checkpoint)) if checkpoint else None
+    scanned = imported = 0
+    async for message in review_channel.history(limit=None, after=after, oldest_first=True):
+        scanned += 1
+        if message.author.id == bot.user.id:
+            for position, embed in enumerate(message.embeds):
+                review = parse_review_embed(embed)
+                if review and store.record_review(message.id, position, *review, message.created_at.timestamp()):
+                    imported += 1
+        if scanned % CHECKPOINT_EVERY == 0:
+            store.set_value(checkpoint_key, message.id)
+        last_id = message.id
+    if scanned:
+        store.set_value(checkpoint_key, last_id)
+    return scanned, imported
\ No newline at end of file
@@ -0,0 +1,748 @@
+"""Offline load tests for the cogs against fake_discord (no Discord connection needed).
+
+    python bench.py                      # run every scenario, compare with bench_baseline.json
+    python bench.py joins qc_submit      # run some scenarios
+    python bench.py --save-baseline      # record the current numbers as the baseline
+"""
+import argparse
+import asyncio
+import gzip
+import importlib
+import ipaddress
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Benchmarks get their own throwaway store (must be set before store is imported)
+os.environ["STORE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="switch-bench-"), "bench.db")
+os.environ.setdefault("METRICS_PORT", "0")
+
+import discord
+from discord.app_commands import Choice
+from aiohttp import web
+from fake_discord import FakeBot, FakeREST, FakeInteraction, FakeMessage, FakeHTTPResponse, snowflake
+from metrics import metrics, percentiles
+import deadline
+from deadline import DEFER_AFTER, DEADLINE, guarded, respond
+from dispatch import outbox, MERGE_WINDOW
+from images import image_checker, CHECK_TIMEOUT, POOL_SIZE
+from config import DESIGNER_ROLE_ID, LOA_ROLE_ID, AUTO_ROLE_ID, ORDER_LOG_CHANNEL_ID
+import permissions
+import store
+
+Control = importlib.import_module("Control")
+Loa = importlib.import_module("Loa")
+Review = importlib.import_module("Review")
+OrderClaimed = importlib.import_module("order-claimed")
+Ping = importlib.import_module("ping")
+Assign = importlib.import_module("assign")
+History = importlib.import_module("history")
+Export = importlib.import_module("export")
+
+BASELINE_PATH = "bench_baseline.json"
+ORDER_CHANNEL_ID = 1342230000000000001  # Stand-in order ticket channel
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + bytes(2048)  # Served by the local image host
+REGRESSION_TOLERANCE = 0.25  # 25% slower/larger than baseline counts as a regression
+
+class Harness:
+    """A fake guild with the real cogs loaded on a FakeBot."""
+    def __init__(self, rest):
+        self.bot = FakeBot(rest)
+        self.rest = rest
+        self.guild = self.bot.add_guild()
+        for role_id, name in ((DESIGNER_ROLE_ID, "Designer"), (LOA_ROLE_ID, "LOA"), (AUTO_ROLE_ID, "Member")):
+            self.guild.add_role(role_id, name)
+        for channel_id, name in (
+            (ORDER_CHANNEL_ID, "order-0001"),
+            (Control.QC_CHANNEL_ID, "quality-control"),
+            (Control.QC_RESULTS_CHANNEL_ID, "qc-results"),
+            (Loa.APPROVAL_CHANNEL_ID, "loa-approvals"),
+            (Review.REVIEW_CHANNEL_ID, "reviews"),
+            (ORDER_LOG_CHANNEL_ID, "order-log"),
+        ):
+            self.guild.add_channel(channel_id, name)
+        self.designers = [self.guild.add_member(roles=[DESIGNER_ROLE_ID]) for _ in range(25)]
+        self.customers = [self.guild.add_member() for _ in range(25)]
+        self.interactions = []
+        self.image_base = None  # Local image host URL, set by run_scenario
+
+    async def load_cogs(self):
+        await self.bot.add_cog(Control.QualityControl(self.bot))
+        await self.bot.add_cog(Loa.LOARequest(self.bot))
+        await self.bot.add_cog(Review.ReviewCommand(self.bot))
+        await self.bot.add_cog(OrderClaimed.ClaimOrder(self.bot))
+        await self.bot.add_cog(Ping.PingCommand(self.bot))
+        await self.bot.add_cog(Assign.Assignment(self.bot))
+        await self.bot.add_cog(History.History(self.bot))
+
+    def interaction(self, user, message=None, kind=discord.InteractionType.application_command, channel=None):
+        interaction = FakeInteraction(self.bot, user, channel or self.guild.get_channel(ORDER_CHANNEL_ID), message, kind)
+        self.interactions.append(interaction)
+        return interaction
+
+    def cog(self, name):
+        return self.bot.get_cog(name)
+
+# 🔹 Local image host (real HTTP on 127.0.0.1 so QC image checks use the pooled client)
+async def start_image_host():
+    async def image(request):
+        return web.Response(body=PNG_BYTES, content_type="image/png")
+
+    async def no_head(request):
+        # Hosts that refuse HEAD and only answer ranged GETs
+        if request.method == "HEAD":
+            return web.Response(status=405)
+        end = int(request.headers.get("Range", "bytes=0-").split("-")[1] or len(PNG_BYTES) - 1)
+        return web.Response(status=206, body=PNG_BYTES[:end + 1], content_type="application/octet-stream")
+
+    async def page(request):
+        return web.Response(text="<html>not an image</html>", content_type="text/html")
+
+    async def slow(request):
+        await asyncio.sleep(CHECK_TIMEOUT * 2)
+        return await image(request)
+
+    async def lagging(request):
+        await asyncio.sleep(CHECK_TIMEOUT * 0.6)
+        return await image(request)
+
+    app = web.Application()
+    app.router.add_get("/img/{name}", image)
+    app.router.add_route("*", "/nohead/{name}", no_head)
+    app.router.add_get("/page", page)
+    app.router.add_get("/slow", slow)
+    app.router.add_route("*", "/lag/{name}", lagging)
+    app.router.add_route("*", "/redirect", lambda request: web.HTTPFound(request.query["to"]))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+async def invoke(command, cog, interaction, *args):
+    """Runs an app command like the tree does: checks first, then the callback."""
+    try:
+        for check in command.checks:
+            await discord.utils.maybe_coroutine(check, interaction)
+    except discord.app_commands.CheckFailure as error:
+        await permissions.on_app_command_error(interaction, error)
+        return
+    await command.callback(cog, interaction, *args)
+
+async def timed_event(latencies, coro):
+    start = time.perf_counter()
+    await coro
+    latencies.append(time.perf_counter() - start)
+
+# 🔹 Scenarios (each returns per-event latencies in seconds)
+async def scenario_joins(h, count, args):
+    """`count` member joins at `--join-rate` per minute through bot.on_member_join."""
+    import bot as bot_module
+    from welcome import JoinPipeline, WELCOME_WINDOW
+
+    welcome_channel = h.guild.add_channel(bot_module.WELCOME_CHANNEL_ID, "welcome")
+    pipeline = JoinPipeline(h.bot, bot_module.WELCOME_CHANNEL_ID, bot_module.WELCOME_EMOJI_ID, AUTO_ROLE_ID, window=WELCOME_WINDOW * args.time_scale)
+    bot_module.join_pipeline = pipeline
+    pipeline.start()
+
+    interval = 60.0 / args.join_rate * args.time_scale
+    joined = {}
+    for _ in range(count):
+        member = h.guild.add_member()
+        joined[member.mention] = time.perf_counter()
+        await bot_module.on_member_join(member)
+        await asyncio.sleep(interval)
+
+    await pipeline.roles.join()
+    while pipeline.joins.qsize() or pipeline.counters["joins"] > sum(m.content.count("<@") for m in welcome_channel.sent):
+        await asyncio.sleep(0.01)
+    pipeline.stop()
+
+    # Latency = join -> welcome message that mentions the member
+    latencies = []
+    for message in welcome_channel.sent:
+        for mention, joined_at in joined.items():
+            if mention in message.content:
+                latencies.append(message.sent_at - joined_at)
+    return latencies
+
+async def submit_qc(h, designer, order_id, latencies):
+    cog = h.cog("QualityControl")
+    command_interaction = h.interaction(designer)
+    await invoke(cog.control, cog, command_interaction, order_id, designer)
+    modal = command_interaction.response.modal
+    if modal is None:
+        return
+    modal.images._value = f"{h.image_base}/img/{order_id}-front.png, {h.image_base}/img/{order_id}-back.png, {h.image_base}/img/logo.png"
+    await timed_event(latencies, modal.on_submit(h.interaction(designer, kind=discord.InteractionType.modal_submit)))
+
+async def scenario_qc_submit(h, count, args):
+    """`count` concurrent /control submissions (command + image modal)."""
+    latencies = []
+    await asyncio.gather(*(submit_qc(h, h.designers[i % len(h.designers)], f"QC-{snowflake()}", latencies) for i in range(count)))
+    return latencies
+
+async def scenario_images(h, count, args):
+    """`count` staggered image checks of 4 links each (new, shared, HEAD-refusing, sometimes broken); fails on a wrong verdict."""
+    latencies = []
+    expected = {}
+
+    async def check(i):
+        urls = [f"{h.image_base}/img/{i}.png", f"{h.image_base}/img/logo.png", f"{h.image_base}/nohead/{i % 50}.png"]
+        urls.append(f"{h.image_base}/page" if i % 25 == 0 else f"{h.image_base}/img/{i}-b.png")
+        if i == 0:
+            urls.append(f"{h.image_base}/slow")
+        for url in urls:
+            expected[url] = not url.endswith(("/page", "/slow"))
+        start = time.perf_counter()
+        results = await image_checker.check_all(urls)
+        latencies.append(time.perf_counter() - start)
+        for result in results:
+            if result.ok != expected[result.url]:
+                raise AssertionError(f"{result.url}: expected ok={expected[result.url]}, got {result}")
+
+    tasks = []
+    for i in range(count):
+        tasks.append(asyncio.create_task(check(i)))
+        await asyncio.sleep(0.005)  # ~200 submissions per second
+    await asyncio.gather(*tasks)
+
+    # Three pools' worth of slow-but-good links at once: waiting for a connection must not count as timing out
+    lagging = await image_checker.check_all([f"{h.image_base}/lag/{i}.png" for i in range(3 * POOL_SIZE)])
+    if not all(result.ok for result in lagging):
+        raise AssertionError(f"{sum(not result.ok for result in lagging)}/{len(lagging)} slow links failed while waiting for a connection")
+
+    # Only the bench's own host is allowed: other loopback, link-local and private targets are refused, also behind a redirect
+    private = f"http://127.0.0.2:{h.image_base.rsplit(':', 1)[1]}/img/private.png"
+    verdicts = {
+        f"{h.image_base}/redirect?to={h.image_base}/img/moved.png": "image/png",
+        private: "private address",
+        f"{h.image_base}/redirect?to={private}": "private address",
+        "http://169.254.169.254/latest/meta-data/": "private address",
+        "http://[::1]/metrics": "private address",
+        "http://10.0.0.5/logo.png": "private address",
+    }
+    for result in await image_checker.check_all(list(verdicts)):
+        if result.reason != verdicts[result.url]:
+            raise AssertionError(f"{result.url}: expected {verdicts[result.url]}, got {result.reason}")
+    return latencies
+
+async def scenario_qc_decide(h, count, args):
+    """Submits `count` designs, then reviewers approve half and deny half concurrently."""
+    await scenario_qc_submit(h, count, args)
+    h.rest.reset()
+    view = h.cog("QualityControl").approval_view
+    messages = [m for m in h.guild.get_channel(Control.QC_CHANNEL_ID).sent if m.id in view.pending]
+    reviewer = h.designers[0]
+    latencies = []
+
+    async def decide(i, message):
+        interaction = h.interaction(reviewer, message, discord.InteractionType.component)
+        if i % 2 == 0:
+            await view.approve.callback(interaction)
+            return
+        await view.deny.callback(interaction)
+        modal = interaction.response.modal
+        if modal:
+            modal.reason._value = "Lines are blurry"
+            await modal.on_submit(h.interaction(reviewer, message, discord.InteractionType.modal_submit))
+
+    await asyncio.gather(*(timed_event(latencies, decide(i, message)) for i, message in enumerate(messages)))
+    return latencies
+
+async def scenario_races(h, count, args):
+    """Submits `count` designs, then three reviewers hit each one at once (two Approves, one Deny); fails unless exactly one decision lands."""
+    await scenario_qc_submit(h, count, args)
+    view = h.cog("QualityControl").approval_view
+    messages = [m for m in h.guild.get_channel(Control.QC_CHANNEL_ID).sent if m.id in view.pending]
+    reviewers = h.designers[:3]
+    h.rest.reset()
+    latencies = []
+    clicks = []
+
+    async def approve(reviewer, message):
+        interaction = h.interaction(reviewer, message, discord.InteractionType.component)
+        clicks.append(interaction)
+        await view.approve.callback(interaction)
+
+    async def deny(reviewer, message):
+        interaction = h.interaction(reviewer, message, discord.InteractionType.component)
+        clicks.append(interaction)
+        await view.deny.callback(interaction)
+        modal = interaction.response.modal
+        if modal:
+            modal.reason._value = "Lines are blurry"
+            submit = h.interaction(reviewer, message, discord.InteractionType.modal_submit)
+            clicks.append(submit)
+            await modal.on_submit(submit)
+
+    await asyncio.gather(*(
+        timed_event(latencies, click(reviewer, message))
+        for message in messages
+        for click, reviewer in ((approve, reviewers[0]), (approve, reviewers[1]), (deny, reviewers[2]))
+    ))
+    await outbox.drain()
+
+    edits = sum(1 for interaction in clicks if interaction.response.kind == "edit")
+    decided = store.get_connection().execute(
+        "SELECT COUNT(*) FROM decisions WHERE message_id IN (%s)" % ",".join(str(m.id) for m in messages)
+    ).fetchone()[0]
+    results = store.get_connection().execute(
+        "SELECT COUNT(*) FROM qc_results WHERE order_id IN (%s)" % ",".join(f"'{m.embeds[0].fields[0].value}'" for m in messages)
+    ).fetchone()[0]
+    posts = sum(m.content.count("<@") for m in h.guild.get_channel(Control.QC_RESULTS_CHANNEL_ID).sent if m.content)
+    if not edits == decided == results == posts == len(messages):
+        raise AssertionError(f"{len(messages)} messages but {edits} edits, {decided} decisions, {results} QC results, {posts} result posts")
+
+    # Late clicks on decided messages cost only their own ephemeral reply
+    before = h.rest.total_calls()
+    late = [h.interaction(reviewers[1], message, discord.InteractionType.component) for message in messages]
+    await asyncio.gather(*(view.approve.callback(interaction) for interaction in late))
+    if h.rest.total_calls() - before != len(late) or any("already" not in interaction.sent[-1][0] for interaction in late):
+        raise AssertionError(f"{len(late)} late clicks made {h.rest.total_calls() - before} REST calls")
+
+    # Two /control forms opened for one order before either was sent: only one submission reaches QC, and /control then refuses it
+    cog = h.cog("QualityControl")
+    qc_channel = h.guild.get_channel(Control.QC_CHANNEL_ID)
+    order_id, designer = f"QC-{snowflake()}", reviewers[0]
+    modals = []
+    for _ in range(2):
+        interaction = h.interaction(designer)
+        await invoke(cog.control, cog, interaction, order_id, designer)
+        modals.append(interaction.response.modal)
+    posted = len(qc_channel.sent)
+    for modal in modals:
+        modal.images._value = f"{h.image_base}/img/{order_id}.png"
+        await modal.on_submit(h.interaction(designer, kind=discord.InteractionType.modal_submit))
+    again = h.interaction(designer)
+    await invoke(cog.control, cog, again, order_id, designer)
+    if len(qc_channel.sent) - posted != 1 or again.response.modal is not None:
+        raise AssertionError(f"one order reached QC {len(qc_channel.sent) - posted} times")
+
+    # A submission Discord refuses to post leaves the order as it was: a new order is dropped, a claimed one stays claimed
+    fresh, claimed = f"QC-{snowflake()}", f"QC-{snowflake()}"
+    store.claim_order(claimed, designer.id)
+
+    async def refuse(*args, **kwargs):
+        raise discord.HTTPException(FakeHTTPResponse(500), "Internal Server Error")
+
+    qc_channel.send = refuse
+    try:
+        for failed in (fresh, claimed):
+            interaction = h.interaction(designer)
+            await invoke(cog.control, cog, interaction, failed, designer)
+            interaction.response.modal.images._value = f"{h.image_base}/img/{failed}.png"
+            submit = h.interaction(designer, kind=discord.InteractionType.modal_submit)
+            await interaction.response.modal.on_submit(submit)
+            if "could not be posted" not in submit.sent[-1][0]:
+                raise AssertionError(f"failed post answered {submit.sent[-1][0]!r}")
+    finally:
+        del qc_channel.send
+    if store.get_order(fresh) is not None or store.get_order(claimed)["status"] != "claimed":
+        raise AssertionError(f"failed posts left {store.get_order(fresh)} and {store.get_order(claimed)}")
+    return latencies
+
+async def scenario_loa(h, count, args):
+    """`count` LOA requests, each approved by a designer."""
+    cog = h.cog("LOARequest")
+    latencies = []
+
+    async def request_and_approve(member):
+        await invoke(cog.request, cog, h.interaction(member), "5d", "Vacation")
+        message = next(m for m in reversed(h.guild.get_channel(Loa.APPROVAL_CHANNEL_ID).sent) if cog.approval_view.pending.get(m.id, {}).get("requester_id") == member.id)
+        await cog.approval_view.approve.callback(h.interaction(h.designers[0], message, discord.InteractionType.component))
+
+    members = [h.guild.add_member(roles=[DESIGNER_ROLE_ID]) for _ in range(count)]
+    await asyncio.gather(*(timed_event(latencies, request_and_approve(member)) for member in members))
+    return latencies
+
+async def scenario_reviews(h, count, args):
+    """`count` customers leaving a review through the /review form (a third fill product and stars in on the command)."""
+    cog = h.cog("ReviewCommand")
+    latencies = []
+
+    async def review(i):
+        customer, designer = h.customers[i % len(h.customers)], h.designers[i % len(h.designers)]
+        product, stars = Review.PRODUCT_TYPES[i % len(Review.PRODUCT_TYPES)][0], i % 5 + 1
+        interaction = h.interaction(customer)
+        if i % 3 == 0:
+            await invoke(cog.review, cog, interaction, designer, customer, "Great work", Choice(name=product, value=product), Choice(name="⭐" * stars, value=stars))
+        else:
+            await invoke(cog.review, cog, interaction, designer, customer, "Great work")
+        view = interaction.sent[-1][1]["view"]
+        clicks = []
+        if i % 3:
+            view.select_product._values = [product]
+            clicks.append(h.interaction(customer, kind=discord.InteractionType.component))
+            await view.select_product.callback(clicks[-1])
+            view.select_stars._values = [str(stars)]
+            clicks.append(h.interaction(customer, kind=discord.InteractionType.component))
+            await view.select_stars.callback(clicks[-1])
+        clicks.append(h.interaction(customer, kind=discord.InteractionType.component))
+        await view.submit.callback(clicks[-1])
+        # Every step edits the one form message
+        if any(click.response.kind != "edit" or click.sent for click in clicks):
+            raise AssertionError(f"review {i} sent extra messages: {[(click.response.kind, click.sent) for click in clicks]}")
+
+    await asyncio.gather(*(timed_event(latencies, review(i)) for i in range(count)))
+    return latencies
+
+async def scenario_abandon(h, count, args):
+    """`count` review forms where two thirds are abandoned partway; fails unless every abandoned form expires, is edited and dropped."""
+    cog = h.cog("ReviewCommand")
+    timeout, Review.REVIEW_TIMEOUT = Review.REVIEW_TIMEOUT, 1.0
+    latencies = []
+    abandoned = []
+
+    async def review(i):
+        customer, designer = h.customers[i % len(h.customers)], h.designers[i % len(h.designers)]
+        interaction = h.interaction(customer)
+        await invoke(cog.review, cog, interaction, designer, customer, "Great work")
+        view = interaction.sent[-1][1]["view"]
+        if i % 3 == 2:
+            abandoned.append(interaction)
+            return
+        view.select_product._values = [Review.PRODUCT_TYPES[i % len(Review.PRODUCT_TYPES)][0]]
+        await view.select_product.callback(h.interaction(customer, kind=discord.InteractionType.component))
+        if i % 3 == 1:
+            abandoned.append(interaction)
+            return
+        view.select_stars._values = ["5"]
+        await view.select_stars.callback(h.interaction(customer, kind=discord.InteractionType.component))
+        await view.submit.callback(h.interaction(customer, kind=discord.InteractionType.component))
+
+    try:
+        await asyncio.gather(*(timed_event(latencies, review(i)) for i in range(count)))
+        deadline_at = time.perf_counter() + Review.REVIEW_TIMEOUT * 5
+        while (h.bot.live_views or any(not interaction.edits for interaction in abandoned)) and time.perf_counter() < deadline_at:
+            await asyncio.sleep(0.05)
+    finally:
+        Review.REVIEW_TIMEOUT = timeout
+    expired = sum(1 for interaction in abandoned if interaction.edits and interaction.edits[-1].get("view", True) is None)
+    if h.bot.live_views or expired != len(abandoned):
+        raise AssertionError(f"{len(h.bot.live_views)} forms still listening, {expired}/{len(abandoned)} abandoned forms expired")
+    return latencies
+
+async def scenario_claims(h, count, args):
+    """`count` concurrent /claim calls where half race for an already-claimed order."""
+    cog = h.cog("ClaimOrder")
+    latencies = []
+    order_ids = [f"ORD-{snowflake()}" for _ in range(count // 2 or 1)]
+    await asyncio.gather(*(
+        timed_event(latencies, invoke(cog.claim, cog, h.interaction(h.designers[i % len(h.designers)]), order_ids[i % len(order_ids)]))
+        for i in range(count)
+    ))
+
+    # Replies the watchdog had to defer keep the handler's visibility: public /claim-style embeds stay public
+    @guarded(ephemeral=False)
+    async def slow_reply(interaction, **kwargs):
+        await asyncio.sleep(deadline.DEFER_AFTER * 1.5)
+        await respond(interaction, **kwargs)
+
+    public, private = h.interaction(h.designers[0]), h.interaction(h.designers[0])
+    await slow_reply(public, embed=discord.Embed(title="📢 Order Claimed"))
+    await slow_reply(private, content="⚠️ Already claimed", ephemeral=True)
+    if public.response.deferred != {"ephemeral": False, "thinking": True} or public.original_deleted:
+        raise AssertionError(f"public reply was deferred with {public.response.deferred}")
+    if not private.original_deleted or not private.sent[-1][1].get("ephemeral"):
+        raise AssertionError("an ephemeral reply after a public defer was not sent on its own")
+    return latencies
+
+async def scenario_assign(h, count, args):
+    """`count` concurrent /assign calls over mixed products while QC results land and a fifth of the designers are on LOA; fails on a bad pick."""
+    cog = h.cog("Assignment")
+    await cog.rebuild()
+    on_loa = set()
+    for designer in h.designers[::5]:
+        await designer.add_roles(h.guild.get_role(LOA_ROLE_ID))
+        cog.set_on_loa(designer.id, True)
+        on_loa.add(designer.id)
+    available = [designer.id for designer in h.designers if designer.id not in on_loa]
+    before = [cog.queue.designers[designer_id].open_orders for designer_id in available]
+    h.rest.reset()
+    latencies = []
+    prefix = f"AS-{snowflake()}-"  # Order ids unique to this run (scenarios share one store)
+    products = [Choice(name=name, value=name) for name, _ in Review.PRODUCT_TYPES] + [None]
+
+    async def assign(i):
+        interaction = h.interaction(h.designers[1])
+        await invoke(cog.assign, cog, interaction, f"{prefix}{i}", products[i % len(products)])
+        if i % 3 == 0:
+            # Every third order gets a QC verdict straight away, mostly passes
+            order = store.get_order(f"{prefix}{i}")
+            h.bot.dispatch("qc_result", order["order_id"], order["designer_id"], i % 9 != 0)
+
+    await asyncio.gather(*(timed_event(latencies, assign(i)) for i in range(count)))
+    # Claims and QC results for people outside the queue (customers, former designers) must not add them to it
+    outsider = h.customers[0].id
+    h.bot.dispatch("order_claimed", {"order_id": f"{prefix}outsider", "designer_id": outsider})
+    h.bot.dispatch("qc_result", f"{prefix}outsider", outsider, True)
+    await asyncio.sleep(0)
+
+    loads = [cog.queue.designers[designer_id].open_orders for designer_id in available]
+    picked = {store.get_order(f"{prefix}{i}")["designer_id"] for i in range(count)}
+    if outsider in cog.queue.designers:
+        raise AssertionError("a non-designer was added to the assignment queue")
+    if picked & on_loa:
+        raise AssertionError(f"orders assigned to designers on LOA: {picked & on_loa}")
+    # New work goes to the least loaded, so the spread never grows past what earlier traffic left
+    if max(loads) - min(loads) > max(max(before) - min(before), 3):
+        raise AssertionError(f"unbalanced open orders: min {min(loads)}, max {max(loads)} (was {min(before)}-{max(before)})")
+
+    # Lean cache: nobody is cached at startup, so the rebuild pages through the guild; interactions keep the queue current after that
+    designer_role = h.guild.get_role(DESIGNER_ROLE_ID)
+    newcomer, former, promoted = (h.guild.add_member(roles=roles, cached=False) for roles in ([DESIGNER_ROLE_ID], [DESIGNER_ROLE_ID], []))
+    store.claim_order(f"{prefix}former", former.id)
+    await former.remove_roles(designer_role)
+    cache_mode = Assign.CACHE_MODE
+    Assign.CACHE_MODE, permissions.role_cache.enabled = "lean", False  # Lean mode reads roles off each member
+    try:
+        await cog.rebuild()
+        if newcomer.id not in cog.queue.designers or former.id in cog.queue.designers:
+            raise AssertionError("the lean rebuild missed a new designer or kept a former one")
+        await promoted.add_roles(designer_role)
+        await newcomer.remove_roles(designer_role)
+        await cog.on_interaction(h.interaction(promoted))
+        await cog.on_interaction(h.interaction(newcomer))
+        if promoted.id not in cog.queue.designers or newcomer.id in cog.queue.designers:
+            raise AssertionError("interactions did not bring the queue in line with the members' roles")
+        await promoted.remove_roles(designer_role)
+        cog.check_member(promoted)
+    finally:
+        Assign.CACHE_MODE, permissions.role_cache.enabled = cache_mode, True
+    return latencies
+
+async def scenario_outbox(h, count, args):
+    """`count` results posts (mention + embed each) to one channel, plus a status message edited after every post."""
+    channel = h.guild.get_channel(Control.QC_RESULTS_CHANNEL_ID)
+    status = await channel.send("Starting")
+    h.rest.reset()
+    latencies = []
+
+    async def post(i):
+        start = time.perf_counter()
+        outbox.send(channel, f"<@{h.designers[i % len(h.designers)].id}> ❌ Product was Denied")
+        await outbox.send(channel, embed=discord.Embed(title="❌ Quality Check Denied", description=f"Submission {i}"))
+        latencies.append(time.perf_counter() - start)
+        outbox.edit(status, content=f"Posted {len(latencies)}/{count}")
+        await asyncio.sleep(0)
+
+    for i in range(count):
+        asyncio.create_task(post(i))
+        await asyncio.sleep(outbox.window / 4)
+    await outbox.drain()
+    return latencies
+
+async def scenario_pings(h, count, args):
+    """`count` concurrent /ping calls."""
+    cog = h.cog("PingCommand")
+    latencies = []
+    await asyncio.gather(*(timed_event(latencies, invoke(cog.ping, cog, h.interaction(h.customers[0]))) for _ in range(count)))
+    return latencies
+
+async def scenario_export(h, count, args):
+    """Real QC/review/claim/assign/LOA traffic padded to `count` history messages, exported twice (resume) and searched; fails on lost, duplicated or unbounded work."""
+    await scenario_qc_decide(h, 20, args)
+    await scenario_reviews(h, 20, args)
+    await scenario_claims(h, 20, args)
+    await scenario_assign(h, 20, args)
+    await scenario_loa(h, 10, args)
+    await outbox.drain()
+    await deadline.drain()
+    expected = {"qc_submission": 20, "qc_result": 20, "review": 20, "claim": 10, "assignment": 20, "loa_request": 10}
+
+    channels = [h.guild.get_channel(channel_id) for channel_id in History.HISTORY_CHANNEL_IDS]
+    directory = tempfile.mkdtemp(prefix="switch-export-")
+    latencies = []
+
+    def exported_kinds():
+        kinds = {}
+        for channel in channels:
+            with gzip.open(os.path.join(directory, f"{channel.id}.jsonl.gz"), "rt") as file:
+                for line in file:
+                    kind = json.loads(line)["kind"]
+                    kinds[kind] = kinds.get(kind, 0) + 1
+        return kinds
+
+    # Every layout the cogs post parses into exactly one record per event
+    await timed_event(latencies, Export.export_history(h.bot, channels, directory))
+    if exported_kinds() != expected:
+        raise AssertionError(f"exported {exported_kinds()}, expected {expected}")
+
+    # Copies of real traffic (plus some chatter from members) make the history long
+    real = [message for channel in channels for message in channel.sent]
+    for i in range(max(0, count - len(real))):
+        original = real[i % len(real)]
+        copy = FakeMessage(original.channel, original.content, original.embeds)
+        if i % 4 == 0:
+            copy.author = h.customers[0]
+        original.channel.sent.append(copy)
+    h.rest.reset()
+
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    results = await Export.export_history(h.bot, channels, directory)
+    latencies.append(time.perf_counter() - start)
+    growth = tracemalloc.get_traced_memory()[1] - before
+    scanned = sum(scanned for scanned, _ in results.values())
+    exported = sum(exported for _, exported in results.values())
+    print(f"📦 export: {scanned} messages -> {exported} records, {growth / 1024:.0f} KiB peak growth, {h.rest.total_calls()} REST calls")
+    if scanned != max(0, count - len(real)) or growth > 4 * 1024 * 1024:
+        raise AssertionError(f"resumed export scanned {scanned} messages, peak growth {growth / 1024:.0f} KiB")
+
+    # An export interrupted mid-batch leaves junk after the checkpoint; the next run must drop it
+    with open(os.path.join(directory, f"{Control.QC_RESULTS_CHANNEL_ID}.jsonl.gz"), "ab") as file:
+        file.write(b"\x1f\x8b partial batch")
+    await submit_qc(h, h.designers[0], "QC-AFTER-EXPORT", [])
+    results = await Export.export_history(h.bot, channels, directory)
+    if sum(scanned for scanned, _ in results.values()) != 1 or sum(exported_kinds().values()) != sum(expected.values()) + exported + 1:
+        raise AssertionError(f"export after an interruption: {results}, {exported_kinds()}")
+
+    # Decisions come from the store, with the order or requester the results posts and footers leave out
+    decisions = store.get_connection().execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+    if Export.export_decisions(directory) != decisions:
+        raise AssertionError(f"expected {decisions} exported decisions")
+    requester = json.loads(store.get_connection().execute("SELECT payload FROM decisions WHERE kind = 'loa' ORDER BY rowid DESC").fetchone()[0])["requester_id"]
+    if not store.search_history("", "loa_decision", requester) or not store.search_history("blurry", "qc_decision"):
+        raise AssertionError("decision records are missing their requester or denial reason")
+
+    # A submission exported while pending is settled by the decision made afterwards
+    view = h.cog("QualityControl").approval_view
+    pending = next(m for m in h.guild.get_channel(Control.QC_CHANNEL_ID).sent if m.id in view.pending and m.embeds[0].fields[0].value == "QC-AFTER-EXPORT")
+    await view.approve.callback(h.interaction(h.designers[1], pending, discord.InteractionType.component))
+    if Export.export_decisions(directory) != 1:
+        raise AssertionError("the new decision was not exported exactly once")
+    statuses = {row["kind"]: row["status"] for row in store.search_history("QC-AFTER-EXPORT")}
+    if statuses != {"qc_submission": "approved", "qc_decision": "approved"}:
+        raise AssertionError(f"late decision left {statuses}")
+
+    for query, kind in (("QC-AFTER-EXPORT", None), ("blurry", "qc_result"), ("Vacation", "loa_request"), ("", "review")):
+        start = time.perf_counter()
+        rows = store.search_history(query, kind)
+        latencies.append(time.perf_counter() - start)
+        if not rows:
+            raise AssertionError(f"no search results for {query!r} ({kind})")
+    return latencies
+
+SCENARIOS = {
+    "joins": (scenario_joins, 1000),
+    "qc_submit": (scenario_qc_submit, 200),
+    "images": (scenario_images, 200),
+    "qc_decide": (scenario_qc_decide, 200),
+    "races": (scenario_races, 200),
+    "loa": (scenario_loa, 100),
+    "reviews": (scenario_reviews, 200),
+    "abandon": (scenario_abandon, 600),
+    "claims": (scenario_claims, 500),
+    "assign": (scenario_assign, 500),
+    "outbox": (scenario_outbox, 500),
+    "pings": (scenario_pings, 500),
+    "export": (scenario_export, 20000),
+}
+
+async def run_scenario(name, args):
+    scenario, default_count = SCENARIOS[name]
+    count = args.count or default_count
+    rest = FakeREST(latency=args.latency / 1000, jitter=args.latency / 4000, time_scale=args.time_scale)
+    harness = Harness(rest)
+    # The interaction deadline shrinks with the REST clock so auto-defers show up at the same load
+    deadline.DEFER_AFTER, deadline.DEADLINE = DEFER_AFTER * args.time_scale, DEADLINE * args.time_scale
+    outbox.window = MERGE_WINDOW * args.time_scale
+    metrics.buckets.clear()
+    image_checker.cache.clear()
+    image_checker.allowed_networks = [ipaddress.ip_network("127.0.0.1/32")]  # The local image host below
+    image_host, harness.image_base = await start_image_host()
+    await harness.load_cogs()
+    rest.reset()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    latencies = await scenario(harness, count, args)
+    await outbox.drain()  # Queued and background REST work still counts towards the scenario
+    await deadline.drain()
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    for cog in list(harness.bot.cogs.values()):
+        await discord.utils.maybe_coroutine(cog.cog_unload)
+    await image_checker.close()
+    await image_host.cleanup()
+
+    points = percentiles(latencies)
+    acks = percentiles([i.responded_at - i.received_at for i in harness.interactions if i.responded_at])
+    events = len(latencies) or 1
+    return {
+        "events": len(latencies),
+        "wall_s": wall,
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "p50_ms": points[50] * 1000,
+        "p95_ms": points[95] * 1000,
+        "p99_ms": points[99] * 1000,
+        "ack_p95_ms": acks[95] * 1000,
+        "rest_per_event": rest.total_calls() / events,
+        "rate_limited": rest.rate_limited,
+        "peak_kib": peak / 1024,
+    }
+
+def print_report(results):
+    print(f"{'scenario':<11} {'events':>6} {'wall s':>7} {'ev/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ack p95':>8} {'REST/ev':>8} {'429s':>5} {'peak KiB':>9}")
+    for name, r in results.items():
+        print(f"{name:<11} {r['events']:>6} {r['wall_s']:>7.2f} {r['throughput']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r.get('ack_p95_ms', 0.0):>8.1f} {r['rest_per_event']:>8.2f} {r['rate_limited']:>5} {r['peak_kib']:>9.0f}")
+
+def compare(results, baseline):
+    """Returns a list of human readable regressions against the baseline."""
+    regressions = []
+    limit = 1 + REGRESSION_TOLERANCE
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if r["throughput"] < base["throughput"] / limit:
+            regressions.append(f"{name}: throughput {r['throughput']:.1f} ev/s vs baseline {base['throughput']:.1f}")
+        if r["p95_ms"] > base["p95_ms"] * limit:
+            regressions.append(f"{name}: p95 {r['p95_ms']:.1f}ms vs baseline {base['p95_ms']:.1f}ms")
+        if base.get("ack_p95_ms") and r["ack_p95_ms"] > base["ack_p95_ms"] * limit:
+            regressions.append(f"{name}: ack p95 {r['ack_p95_ms']:.1f}ms vs baseline {base['ack_p95_ms']:.1f}ms")
+        if r["rest_per_event"] > base["rest_per_event"] + 0.01:
+            regressions.append(f"{name}: {r['rest_per_event']:.2f} REST calls/event vs baseline {base['rest_per_event']:.2f}")
+        if r["peak_kib"] > base["peak_kib"] * limit:
+            regressions.append(f"{name}: peak memory {r['peak_kib']:.0f}KiB vs baseline {base['peak_kib']:.0f}KiB")
+    return regressions
+
+async def main(args):
+    results = {}
+    for name in args.scenarios or SCENARIOS:
+        results[name] = await run_scenario(name, args)
+    print(f"⏱️ REST latency {args.latency:.0f}ms, time scale {args.time_scale}")
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for regression in regressions:
+            print(f"⚠️ REGRESSION {regression}")
+        if not regressions:
+            print("✅ No regressions against baseline")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Switch Customs bot.")
+    parser.add_argument("scenarios", nargs="*", choices=[[]] + list(SCENARIOS), help="Scenarios to run (default: all)")
+    parser.add_argument("--count", type=int, help="Events per scenario (default: per-scenario)")
+    parser.add_argument("--latency", type=float, default=50.0, help="Fake REST latency in ms")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="Scales REST latency, rate-limit windows and join pacing")
+    parser.add_argument("--join-rate", type=float, default=1000.0, help="Joins per minute in the joins scenario")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
\ No newline at end of file
@@ -1,89 +1,117 @@
+import time
+STARTED = time.perf_counter()  # Cold start reference for the startup timings
 import discord
-from discord.ext import commands
 import os
-from dotenv import load_dotenv
 import asyncio  # Required for async functions
+import hashlib
+import json
+import store
+from welcome import JoinPipeline
+from config import AUTO_ROLE_ID, TOKEN
+from permissions import setup_permissions, role_cache
+from metrics import metrics
+from dispatch import outbox
+from extensions import load_extensions, print_load_table
+from members import bot_options, setup_member_cache, member_cache, CACHE_MODE
+from shards import bot_class, shard_options, is_primary, SHARD_IDS, WORKER_ID
 
 # 🔹 Bot Intents (Fixes Missing Privileged Intent Warning)
 intents = discord.Intents.default()
 intents.members = True  # Required for detecting new members
 intents.message_content = True  # Fixes warning
 
-# 🔹 Initialize Bot
-bot = commands.Bot(command_prefix="s?", intents=intents)
+# 🔹 Initialize Bot (AutoShardedBot when runner.py hands this process a set of shards)
+bot = bot_class()(command_prefix="s?", intents=intents, http_trace=metrics.trace_config(), **shard_options(), **bot_options())  # Trace times every REST call; CACHE_MODE picks the member cache policy
 
 # 🔹 Server Configuration
 GUILD_ID = 1342198087933755555  # Server ID
-AUTO_ROLE_ID = 1342201876405555332  # Auto-role ID
 WELCOME_CHANNEL_ID = 1342198088722546780  # Welcome channel ID
 WELCOME_EMOJI_ID = 1342248128270569522  # Custom emoji ID
 
-# 🔹 Load Commands Function
-async def load_commands():
-    """Loads all command cogs from the commands folder."""
-    for filename in os.listdir("commands"):
-        if filename.endswith(".py"):
-            try:
-                module = f"commands.{filename[:-3]}"
-                if module in bot.extensions:  # Unload if already loaded
-                    await bot.unload_extension(module)
-                await bot.load_extension(module)
-                print(f"✅ Loaded: {filename}")
-            except Exception as e:
-                print(f"❌ Failed to load {filename}: {e}")
+# 🔹 Join Pipeline (cached channel/emoji, batched welcomes, queued auto-roles)
+join_pipeline = JoinPipeline(bot, WELCOME_CHANNEL_ID, WELCOME_EMOJI_ID, AUTO_ROLE_ID)
+bot.join_pipeline = join_pipeline
 
-# 🔹 Bot Ready Event
+# 🔹 Shared role checks (cached role-id sets, invalidated by member/role events)
+setup_permissions(bot)
+
+# 🔹 Member cache (lean mode: staff + recently active members, others fetched on demand)
+setup_member_cache(bot)
+
+# 🔹 Metrics (handler latency, time-to-first-response, REST calls; served on a local /metrics endpoint)
+bot.add_listener(metrics.on_interaction, "on_interaction")
+metrics.add_collector(lambda: {f"join_{name}": value for name, value in join_pipeline.stats().items()})
+metrics.add_collector(lambda: {f"role_{name}": value for name, value in role_cache.stats().items()})
+metrics.add_collector(lambda: {f"outbox_{name}": value for name, value in outbox.stats().items()})
+metrics.add_collector(lambda: {f"member_cache_{name}": value for name, value in member_cache.stats().items()})
+
+# 🔹 Command Sync Configuration
+SYNC_GUILD_ONLY = os.getenv("SYNC_GUILD_ONLY", "0") == "1"  # Fast path: sync only to GUILD_ID (instant, separate rate limit)
+FORCE_SYNC = os.getenv("FORCE_SYNC", "0") == "1"  # Sync even if the command tree did not change
+
+# 🔹 Load Extensions (once, before connecting; see extensions.EXTENSIONS)
 @bot.event
-async def on_ready():
-    print(f"✅ Logged in as {bot.user}")
+async def setup_hook():
+    start = time.perf_counter()
+    rows = await load_extensions(bot)
+    print_load_table(rows, (time.perf_counter() - start) * 1000)
 
-    # Force unload QualityControl cog if it's still loaded
-    if "QualityControl" in bot.cogs:
-        try:
-            bot.remove_cog("QualityControl")
-            await bot.unload_extension("commands.qc")
-            print("⚠️ Force Unloaded 'QualityControl' Cog")
-        except Exception as e:
-            print(f"❌ Failed to unload 'QualityControl': {e}")
+# 🔹 Command Tree Hash
+def command_tree_hash(guild=None):
+    """Hashes the serialized slash commands that would be sent to Discord."""
+    payload = sorted((command.to_dict(bot.tree) for command in bot.tree.get_commands(guild=guild)), key=lambda c: c["name"])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
 
-    await load_commands()  # Reload all commands
-    print(f"✅ Final Loaded Cogs: {bot.cogs.keys()}")
+# 🔹 Diff-Based Command Sync
+async def sync_commands():
+    """Syncs slash commands only if the command tree changed since the last sync. Returns timings in ms."""
+    guild = discord.Object(id=GUILD_ID) if SYNC_GUILD_ONLY else None
+    if guild:
+        bot.tree.copy_global_to(guild=guild)
+    scope = str(GUILD_ID) if guild else "global"
 
-    # Sync slash commands
+    start = time.perf_counter()
+    tree_hash = command_tree_hash(guild)
+    hash_ms = (time.perf_counter() - start) * 1000
+
+    if not FORCE_SYNC and store.get_value(f"command_hash:{scope}") == tree_hash:
+        print(f"🔗 Slash commands unchanged ({scope}), skipping sync")
+        return hash_ms, 0.0
+
+    start = time.perf_counter()
     try:
-        synced = await bot.tree.sync()  # Syncs globally instead of just in one server
-        print(f"🔗 Synced {len(synced)} slash commands!")
+        synced = await bot.tree.sync(guild=guild)
+        store.set_value(f"command_hash:{scope}", tree_hash)
+        print(f"🔗 Synced {len(synced)} slash commands ({scope})!")
     except Exception as e:
         print(f"❌ Failed to sync commands: {e}")
+    return hash_ms, (time.perf_counter() - start) * 1000
 
-# 🔹 Auto-Role & Welcome Message
+# 🔹 Bot Ready Event
 @bot.event
-async def on_member_join(member):
-    guild = member.guild
-
-    # Assign Auto-Role
-    try:
-        role = guild.get_role(AUTO_ROLE_ID)
-        if role:
-            await member.add_roles(role)
-    except Exception as e:
-        print(f"❌ Failed to assign auto-role: {e}")
+async def on_ready():
+    print(f"✅ Logged in as {bot.user}" + (f" (worker {WORKER_ID}, shards {','.join(map(str, SHARD_IDS))})" if SHARD_IDS else ""))
+    join_pipeline.start()
+    await metrics.start_server()
 
-    # Fetch custom emoji correctly
-    emoji = discord.utils.get(bot.emojis, id=WELCOME_EMOJI_ID)
+    print(f"✅ Loaded Cogs: {', '.join(bot.cogs)}")
+    if not hasattr(bot, "ready_ms"):
+        bot.ready_ms = (time.perf_counter() - STARTED) * 1000  # First READY only, for /memory
+        print(f"🧠 Member cache mode: {CACHE_MODE}")
 
-    # If the emoji is not found, fallback to an empty string
-    emoji_text = f"{emoji}" if emoji else ""
+    # Sync slash commands (only hits the API when the command tree changed; one worker syncs for all)
+    hash_ms, sync_ms = await sync_commands() if is_primary(bot) else (0.0, 0.0)
+    print(f"⏱️ Startup: ready {(time.perf_counter() - STARTED) * 1000:.0f}ms after start | hash {hash_ms:.1f}ms | sync {sync_ms:.1f}ms")
 
-    # Send Welcome Message
-    try:
-        welcome_channel = await bot.fetch_channel(WELCOME_CHANNEL_ID)  # Ensures the correct channel is fetched
-        if welcome_channel:
-            member_count = guild.member_count
-            await welcome_channel.send(f"{emoji_text} Welcome {member.mention} to Switch Customs. You are member {member_count}")
-    except Exception as e:
-        print(f"❌ Failed to send welcome message: {e}")
+# 🔹 Auto-Role & Welcome Message
+@bot.event
+async def on_member_join(member):
+    join_pipeline.enqueue(member)
 
 # 🔹 Run Bot
-load_dotenv()
-TOKEN = os.getenv("DISCORD_TOKEN") 
\ No newline at end of file
+def main():
+    """Runs this process's bot until it disconnects (runner.py starts one of these per shard range)."""
+    bot.run(TOKEN)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -3,3 +3,17 @@ from dotenv import load_dotenv
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
+
+# 🔹 Role IDs (declared once, imported by every cog)
+DESIGNER_ROLE_ID = 1342201759111712799  # Designer role (also approves LOAs)
+LOA_ROLE_ID = 1342882515676827668  # LOA role
+AUTO_ROLE_ID = 1342201876405555332  # Auto-role given on join
+
+ROLE_NAMES = {
+    DESIGNER_ROLE_ID: "Designer",
+    LOA_ROLE_ID: "LOA",
+    AUTO_ROLE_ID: "Member",
+}
+
+# 🔹 Channel IDs used by more than one cog
+ORDER_LOG_CHANNEL_ID = 1342230845032894514  # Order log channel for claims and assignments (to be changed)
@@ -0,0 +1,121 @@
+import asyncio
+import functools
+import time
+import discord
+from metrics import metrics
+
+# 🔹 Interaction Deadline Guard
+DEADLINE = 3.0  # Discord drops interactions that are not acknowledged within 3 seconds
+DEFER_AFTER = 2.0  # Auto-defer once this much of the deadline is used up
+
+background_tasks = set()
+
+class Responder:
+    """Serializes the first acknowledgement of an interaction and routes later replies to followups."""
+    def __init__(self, interaction, ephemeral=True):
+        self.interaction = interaction
+        self.ephemeral = ephemeral  # Whether the handler's main reply is ephemeral (a "thinking" defer fixes it for the first followup)
+        self.thinking = None  # Ephemerality of the "thinking" message the watchdog left, if any
+        self.lock = asyncio.Lock()
+        self.started = time.perf_counter()
+        # Time already spent before we saw the interaction (gateway delay), clamped for clock skew
+        self.age = min(max((discord.utils.utcnow() - interaction.created_at).total_seconds(), 0.0), DEFER_AFTER)
+
+    def elapsed(self):
+        return self.age + time.perf_counter() - self.started
+
+    def _acknowledged(self):
+        if self.elapsed() > DEADLINE:
+            metrics.count("interaction_deadline_missed")
+
+    async def watchdog(self):
+        await asyncio.sleep(max(0.0, DEFER_AFTER - self.elapsed()))
+        async with self.lock:
+            if self.interaction.response.is_done():
+                return
+            thinking = self.interaction.message is None
+            try:
+                # Slash commands and modals opened by them need a "thinking" defer; components can defer silently
+                await self.interaction.response.defer(ephemeral=self.ephemeral, thinking=thinking)
+            except discord.HTTPException as e:
+                print(f"❌ Failed to defer interaction: {e}")
+                return
+            if thinking:
+                self.thinking = self.ephemeral
+            metrics.count("interaction_auto_deferred")
+            self._acknowledged()
+
+    async def send(self, content=None, **kwargs):
+        async with self.lock:
+            if not self.interaction.response.is_done():
+                await self.interaction.response.send_message(content, **kwargs)
+                self._acknowledged()
+                return
+            if self.thinking is not None:
+                # The first followup replaces the "thinking" message and keeps its visibility; replace it by hand if that's wrong for this reply
+                if kwargs.get("ephemeral", False) != self.thinking:
+                    await self.interaction.delete_original_response()
+                self.thinking = None
+        await self.interaction.followup.send(content, **kwargs)
+
+    async def edit_message(self, **kwargs):
+        async with self.lock:
+            if not self.interaction.response.is_done():
+                await self.interaction.response.edit_message(**kwargs)
+                self._acknowledged()
+                return
+        await self.interaction.edit_original_response(**kwargs)
+
+def guarded(ephemeral=True):
+    """Decorator: auto-defers the interaction if the handler has not responded before DEFER_AFTER.
+
+    Pass ephemeral=False for handlers whose main reply is public, so a deferred reply stays visible to everyone.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            interaction = next(arg for arg in args if hasattr(arg, "response") and hasattr(arg, "followup"))
+            responder = interaction.extras["responder"] = Responder(interaction, ephemeral)
+            watchdog = asyncio.create_task(responder.watchdog())
+            try:
+                return await func(*args, **kwargs)
+            except discord.NotFound as e:
+                if e.code == 10062:  # Unknown interaction: the deadline passed before we answered
+                    metrics.count("interaction_deadline_missed")
+                raise
+            finally:
+                watchdog.cancel()
+        return wrapper
+    return decorator
+
+def responder_for(interaction):
+    responder = interaction.extras.get("responder")
+    if responder is None:
+        responder = interaction.extras["responder"] = Responder(interaction)
+    return responder
+
+async def respond(interaction, content=None, **kwargs):
+    """Sends the reply as the initial response, or as a followup if the interaction was already deferred."""
+    await responder_for(interaction).send(content, **kwargs)
+
+async def edit_message(interaction, **kwargs):
+    """Edits the component's message as the initial response, or via the original response once deferred."""
+    await responder_for(interaction).edit_message(**kwargs)
+
+def background(coro):
+    """Runs secondary REST work after the interaction has been answered; errors are printed, not lost."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(_finish_background)
+    return task
+
+def _finish_background(task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        metrics.count("background_task_failed")
+        print(f"❌ Background task failed: {task.exception()!r}")
+
+async def drain():
+    """Waits for all background work (used on shutdown and by the benchmarks)."""
+    while background_tasks:
+        await asyncio.gather(*list(background_tasks), return_exceptions=True)
\ No newline at end of file
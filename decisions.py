@@ -0,0 +1,61 @@
+import asyncio
+from contextlib import asynccontextmanager
+import discord
+import store
+from metrics import metrics
+
+# 🔹 Approve/Deny Decisions (first decision on a message wins)
+OUTCOMES = {"approved": "✅ approved", "denied": "❌ denied"}
+
+class DecisionLocks:
+    """One asyncio.Lock per message being decided, dropped again once nobody holds or waits on it."""
+    def __init__(self):
+        self.locks = {}  # message id -> [lock, holders and waiters]
+
+    @asynccontextmanager
+    async def hold(self, message_id):
+        entry = self.locks.setdefault(message_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.locks[message_id]
+
+decision_locks = DecisionLocks()
+
+class DecisionView(discord.ui.View):
+    """Persistent Approve/Deny buttons shared by every message of one kind; what each message is about lives in the store."""
+    kind = None  # Pending kind in the store, set by subclasses
+
+    def __init__(self, bot, pending):
+        super().__init__(timeout=None)
+        self.bot = bot
+        self.pending = pending
+
+    def add_pending(self, message, record):
+        self.pending[message.id] = record
+        store.save_pending(message.id, self.kind, message.channel.id, record)
+
+    def get_pending(self, message_id):
+        record = self.pending.get(message_id)
+        if record is None:
+            record = store.get_pending(message_id)
+        return record
+
+def decide(view, message_id, kind, outcome, user_id, reason=None):
+    """Records a decision for a view's pending message. Returns (won, decision); decision is the earlier one if someone got there first."""
+    won, decision = store.decide(message_id, kind, outcome, user_id, reason)
+    view.pending.pop(message_id, None)
+    metrics.count("decisions" if won else "decision_conflicts")
+    return won, decision
+
+def already_decided(message_id, noun):
+    """Reply for a click on a message that was already decided (from the store, no REST lookups)."""
+    decision = store.get_decision(message_id)
+    if decision is None:
+        return f"⚠️ This {noun} has already been handled."
+    outcome = OUTCOMES.get(decision["outcome"], decision["outcome"])
+    return f"⚠️ This {noun} was already {outcome} by <@{decision['decided_by']}> <t:{int(decision['decided_at'])}:R>."
\ No newline at end of file
@@ -0,0 +1,187 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import namedtuple
+from metrics import metrics
+from deadline import background
+
+# 🔹 Outbound Message Dispatcher
+MERGE_WINDOW = 0.25  # Seconds to collect sends to the same channel into one message
+MAX_EMBEDS = 10  # Discord limit per message
+MAX_CONTENT = 2000  # Discord limit per message
+MAX_EMBED_CHARS = 6000  # Combined size of all embeds in one message
+SEND_ROUTE = "POST /channels/{id}/messages"
+
+Delivery = namedtuple("Delivery", "message position")  # position = index of the caller's first embed in the message
+
+class Outbound:
+    """One queued send or edit, and the futures of every caller waiting on it."""
+    def __init__(self, kind, target, content=None, embeds=(), kwargs=None):
+        self.kind = kind  # "send" (target = channel) or "edit" (target = message)
+        self.target = target
+        self.content = content
+        self.embeds = list(embeds)
+        self.kwargs = kwargs or {}
+        self.queued_at = time.perf_counter()
+        self.futures = [asyncio.get_running_loop().create_future()]
+
+    def mergeable(self):
+        return self.kind == "send" and not self.kwargs
+
+class Outbox:
+    """Per-channel queues that merge bursts of sends into one message and drop superseded edits."""
+    def __init__(self, window=MERGE_WINDOW):
+        self.window = window
+        self.queues = {}  # channel id -> [Outbound] in arrival order
+        self.edits = {}  # message id -> queued Outbound edit
+        self.heap = []  # (ready time, seq, channel id), ordered by merge window / bucket reset
+        self.scheduled = set()  # channel ids waiting in the heap or being flushed
+        self.seq = itertools.count()
+        self.wakeup = None
+        self.task = None
+        self.counters = {"requests": 0, "messages": 0, "edits_superseded": 0, "failures": 0}
+
+    def send(self, channel, content=None, *, embed=None, embeds=None, **kwargs):
+        """Queues a message; returns a future resolving to a Delivery once it (or the message it was merged into) is sent."""
+        item = Outbound("send", channel, content, [embed] if embed else embeds or (), kwargs)
+        self.counters["requests"] += 1
+        self.queues.setdefault(channel.id, []).append(item)
+        self._schedule(channel.id)
+        return item.futures[0]
+
+    def edit(self, message, **kwargs):
+        """Queues a message edit; a later edit of the same message before it goes out is merged into it."""
+        queued = self.edits.get(message.id)
+        if queued:
+            queued.kwargs.update(kwargs)
+            queued.futures.append(asyncio.get_running_loop().create_future())
+            self.counters["edits_superseded"] += 1
+            return queued.futures[-1]
+        item = Outbound("edit", message, kwargs=kwargs)
+        self.counters["requests"] += 1
+        self.edits[message.id] = item
+        self.queues.setdefault(message.channel.id, []).append(item)
+        self._schedule(message.channel.id)
+        return item.futures[0]
+
+    def stats(self):
+        messages = self.counters["messages"]
+        return {
+            **self.counters,
+            "merge_ratio": self.counters["requests"] / messages if messages else 1.0,
+            "queued": sum(len(items) for items in self.queues.values()),
+        }
+
+    async def drain(self):
+        """Waits until every queued send and edit has gone out (used on shutdown and by the benchmarks)."""
+        while self.scheduled:
+            await asyncio.sleep(0.01)
+
+    def _schedule(self, channel_id, ready_at=None):
+        if channel_id in self.scheduled:
+            return
+        if self.task is None or self.task.done():
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.create_task(self._run())
+        self.scheduled.add(channel_id)
+        ready_at = time.perf_counter() + self.window if ready_at is None else ready_at
+        heapq.heappush(self.heap, (ready_at, next(self.seq), channel_id))
+        if self.heap[0][2] == channel_id:
+            self.wakeup.set()
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+            ready_at, _, channel_id = self.heap[0]
+            delay = ready_at - time.perf_counter()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self.heap)
+
+            # An exhausted bucket goes back in line at its reset time instead of queueing inside discord.py
+            reset_at = metrics.bucket_reset(SEND_ROUTE, channel_id)
+            if reset_at:
+                heapq.heappush(self.heap, (reset_at, next(self.seq), channel_id))
+                continue
+            background(self._flush(channel_id))
+
+    async def _flush(self, channel_id):
+        items = self.queues.pop(channel_id, [])
+        ready_at = time.perf_counter()
+        try:
+            for batch in batches(items):
+                reset_at = metrics.bucket_reset(SEND_ROUTE, channel_id)
+                if reset_at:
+                    # Bucket ran dry mid-flush: put the rest back in front of anything queued since
+                    unsent = items[items.index(batch[0]):]
+                    self.queues[channel_id] = unsent + self.queues.get(channel_id, [])
+                    ready_at = reset_at
+                    break
+                await self._deliver(batch)
+        finally:
+            self.scheduled.discard(channel_id)
+            if channel_id in self.queues:
+                # More arrived while flushing; they have already waited, so go again without a new window
+                self._schedule(channel_id, ready_at)
+
+    async def _deliver(self, batch):
+        now = time.perf_counter()
+        for item in batch:
+            metrics.observe("outbox_queue_wait", now - item.queued_at)
+        first = batch[0]
+        try:
+            if first.kind == "edit":
+                self.edits.pop(first.target.id, None)
+                message = await first.target.edit(**first.kwargs)
+                results = [(future, message) for future in first.futures]
+            else:
+                content = "\n".join(item.content for item in batch if item.content) or None
+                embeds = [embed for item in batch for embed in item.embeds]
+                kwargs = {**first.kwargs, "embeds": embeds} if embeds else first.kwargs
+                message = await first.target.send(content, **kwargs)
+                results, position = [], 0
+                for item in batch:
+                    results.append((item.futures[0], Delivery(message, position)))
+                    position += len(item.embeds)
+            self.counters["messages"] += 1
+        except Exception as e:
+            self.counters["failures"] += 1
+            print(f"❌ Failed to deliver queued message: {e}")
+            for item in batch:
+                for future in item.futures:
+                    if not future.done():
+                        future.set_exception(e)
+                        future.exception()  # Marks it retrieved; fire-and-forget callers don't need to await
+            return
+
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
+
+def batches(items):
+    """Groups consecutive mergeable sends into messages within Discord's per-message limits."""
+    batch = []
+    for item in items:
+        if batch and not fits(batch, item):
+            yield batch
+            batch = []
+        batch.append(item)
+    if batch:
+        yield batch
+
+def fits(batch, item):
+    if not (batch[0].mergeable() and item.mergeable()):
+        return False
+    embeds = [embed for queued in batch for embed in queued.embeds] + item.embeds
+    content = sum(len(queued.content or "") + 1 for queued in batch) + len(item.content or "")
+    return len(embeds) <= MAX_EMBEDS and content <= MAX_CONTENT and sum(len(embed) for embed in embeds) <= MAX_EMBED_CHARS
+
+outbox = Outbox()
\ No newline at end of file
@@ -0,0 +1,189 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+from collections import namedtuple
+import discord
+import store
+from backfill import parse_review_embed, MENTION_PATTERN
+
+# 🔹 History Export (loaded lazily by the History cog on first use)
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+CHECKPOINT_EVERY = 200  # Messages per gzip member, index transaction and saved checkpoint
+
+QC_SUBMISSION_TITLE = "🛠️ Quality Control Submission"
+QC_DENIAL_TITLE = "❌ Quality Check Denied"
+LOA_REQUEST_TITLE = "📝 LOA Request"
+DENIED_FOOTER = "❌ Denied - Reason: "
+
+CLAIM_PATTERN = re.compile(r"📢 \*\*Order Claimed\*\*: <@!?(\d+)> claimed \*\*Order (.+?)\*\*")
+ASSIGN_PATTERN = re.compile(r"📌 \*\*Order Assigned\*\*: \*\*Order (.+?)\*\* went to <@!?(\d+)> \(assigned by <@!?(\d+)>\)")
+PASSED_PATTERN = re.compile(r"✅ <@!?(\d+)> \*\*Your product has passed Quality Control!\*\*")
+DENIED_PATTERN = re.compile(r"<@!?(\d+)> ❌ Product was Denied")
+
+# One row per thing that happened; fields a kind doesn't have are None
+HistoryRecord = namedtuple("HistoryRecord", "kind channel_id message_id created_at order_id designer_id user_id product status text")
+MESSAGE_KINDS = ("qc_submission", "qc_result", "claim", "assignment", "review", "loa_request")
+DECISION_KINDS = ("qc_decision", "loa_decision")  # From store.decisions: Approve/Deny outcomes, including ones made after their message was exported
+KINDS = MESSAGE_KINDS + DECISION_KINDS
+DECISIONS_FILE = "decisions.jsonl.gz"
+
+def make_record(message, kind, **fields):
+    values = dict.fromkeys(HistoryRecord._fields)
+    values.update(kind=kind, channel_id=message.channel.id, message_id=message.id, created_at=int(message.created_at.timestamp()), **fields)
+    return HistoryRecord(**values)
+
+def mention_id(value):
+    match = MENTION_PATTERN.search(value or "")
+    return int(match.group(1)) if match else None
+
+def footer_status(embed):
+    """Decision written into an Approve/Deny message's footer: (status, denial reason)."""
+    text = embed.footer.text or ""
+    if text.startswith("✅"):
+        return "approved", None
+    if text.startswith(DENIED_FOOTER):
+        return "denied", text[len(DENIED_FOOTER):]
+    return "pending", None
+
+def parse_message(message):
+    """Parses one bot message into HistoryRecords (a message merged by the outbox can hold several)."""
+    records = []
+    denials = [embed for embed in message.embeds if embed.title == QC_DENIAL_TITLE]
+    for line in (message.content or "").splitlines():
+        match = CLAIM_PATTERN.search(line)
+        if match:
+            records.append(make_record(message, "claim", designer_id=int(match.group(1)), order_id=match.group(2), status="claimed"))
+            continue
+        match = ASSIGN_PATTERN.search(line)
+        if match:
+            records.append(make_record(message, "assignment", order_id=match.group(1), designer_id=int(match.group(2)), user_id=int(match.group(3)), status="claimed"))
+            continue
+        match = PASSED_PATTERN.search(line)
+        if match:
+            records.append(make_record(message, "qc_result", designer_id=int(match.group(1)), status="approved"))
+            continue
+        match = DENIED_PATTERN.search(line)
+        if match:
+            # Denial lines and their reason embeds are merged in the same order
+            reason = denials.pop(0).fields[0].value if denials and denials[0].fields else None
+            records.append(make_record(message, "qc_result", designer_id=int(match.group(1)), status="denied", text=reason))
+
+    # Reason embeds posted on their own (before the outbox merged them with the mention)
+    for embed in denials:
+        records.append(make_record(message, "qc_result", status="denied", text=embed.fields[0].value if embed.fields else None))
+
+    for embed in message.embeds:
+        fields = {field.name: field.value for field in embed.fields}
+        if embed.title == QC_SUBMISSION_TITLE:
+            status, reason = footer_status(embed)
+            images = [other.image.url for other in message.embeds if other.image and other.image.url]
+            text = " ".join(filter(None, [reason] + images))
+            records.append(make_record(message, "qc_submission", order_id=fields.get("🆔 Order ID"), designer_id=mention_id(fields.get("👤 Designer")), status=status, text=text))
+        elif embed.title == LOA_REQUEST_TITLE:
+            status, reason = footer_status(embed)
+            text = " ".join(filter(None, [fields.get("Reason"), fields.get("Duration"), reason]))
+            records.append(make_record(message, "loa_request", user_id=mention_id(fields.get("Requester")), status=status, text=text))
+        else:
+            review = parse_review_embed(embed)
+            if review:
+                designer_id, reviewer_id, product, stars = review
+                records.append(make_record(message, "review", designer_id=designer_id, user_id=reviewer_id, product=product, status=f"{stars} stars", text=fields.get("🗒️ Notes")))
+    return records
+
+def decision_record(decision):
+    """One HistoryRecord for a stored Approve/Deny decision, with the order or requester from its pending payload."""
+    payload = json.loads(decision["payload"] or "{}")
+    values = dict.fromkeys(HistoryRecord._fields)
+    values.update(kind=f"{decision['kind']}_decision", channel_id=decision["channel_id"], message_id=decision["message_id"],
+                  created_at=int(decision["decided_at"]), status=decision["outcome"], text=decision["reason"])
+    if decision["kind"] == "qc":
+        values.update(order_id=payload.get("order_id"), designer_id=payload.get("designer_id"), user_id=decision["decided_by"])
+    else:
+        # LOA requests are approved by a Designer
+        values.update(designer_id=decision["decided_by"], user_id=payload.get("requester_id"))
+    return HistoryRecord(**values)
+
+def write_batch(file, records):
+    """Appends records as one complete gzip member (readers see a multi-member .gz as one stream)."""
+    if records:
+        with gzip.GzipFile(fileobj=file, mode="wb") as compressed:
+            for record in records:
+                compressed.write((json.dumps(record._asdict(), ensure_ascii=False) + "\n").encode())
+        file.flush()
+    return file.seek(0, os.SEEK_END)
+
+async def export_channel(bot, channel, directory=EXPORT_DIR):
+    """Streams one channel's history into <directory>/<channel id>.jsonl.gz and the search index, resuming from its checkpoint.
+
+    Only one batch of records is held at a time, so memory stays flat however long the history is.
+    Returns (scanned, exported).
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{channel.id}.jsonl.gz")
+    checkpoint_key = f"history_export:{channel.id}"
+    checkpoint = store.get_value(checkpoint_key)
+    after, offset = None, 0
+    if checkpoint:
+        last_id, offset = map(int, checkpoint.split(":"))
+        after = discord.Object(id=last_id)
+        if not os.path.exists(path) or os.path.getsize(path) < offset:
+            # The export file went missing: start this channel over
+            store.clear_history(checkpoint_key, MESSAGE_KINDS, channel.id)
+            after, offset = None, 0
+
+    scanned = exported = 0
+    batch, last_id = [], None
+    with open(path, "ab") as file:
+        # Drop anything written after the last checkpoint (an export interrupted mid-batch)
+        file.truncate(offset)
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            scanned += 1
+            last_id = message.id
+            if message.author.id == bot.user.id:
+                batch.extend(parse_message(message))
+            if scanned % CHECKPOINT_EVERY == 0:
+                store.index_history(batch, checkpoint_key, f"{last_id}:{write_batch(file, batch)}")
+                exported += len(batch)
+                batch = []
+        if scanned % CHECKPOINT_EVERY:
+            store.index_history(batch, checkpoint_key, f"{last_id}:{write_batch(file, batch)}")
+            exported += len(batch)
+    return scanned, exported
+
+def export_decisions(directory=EXPORT_DIR):
+    """Appends every decision made since the last export to <directory>/decisions.jsonl.gz and the search index.
+
+    Approve/Deny messages are exported once, often while still pending, and LOA outcomes only live in their footer,
+    so decisions come from the store instead. Indexing one also settles the pending record of its message. Returns the count.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, DECISIONS_FILE)
+    checkpoint_key = "history_export:decisions"
+    checkpoint = store.get_value(checkpoint_key)
+    after, offset = (0, 0), 0
+    if checkpoint:
+        decided_at, message_id, offset = checkpoint.split(":")
+        after, offset = (float(decided_at), int(message_id)), int(offset)
+        if not os.path.exists(path) or os.path.getsize(path) < offset:
+            store.clear_history(checkpoint_key, DECISION_KINDS)
+            after, offset = (0, 0), 0
+
+    exported = 0
+    with open(path, "ab") as file:
+        file.truncate(offset)
+        while True:
+            decisions = store.decisions_after(after, CHECKPOINT_EVERY)
+            if not decisions:
+                break
+            after = (decisions[-1]["decided_at"], decisions[-1]["message_id"])
+            batch = [decision_record(decision) for decision in decisions]
+            store.index_history(batch, checkpoint_key, f"{after[0]!r}:{after[1]}:{write_batch(file, batch)}", DECISION_KINDS)
+            exported += len(batch)
+    return exported
+
+async def export_history(bot, channels, directory=EXPORT_DIR):
+    """Exports several channels concurrently (each has its own rate limit bucket). Returns {channel: (scanned, exported)}."""
+    results = await asyncio.gather(*(export_channel(bot, channel, directory) for channel in channels))
+    return dict(zip(channels, results))
\ No newline at end of file
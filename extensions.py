@@ -0,0 +1,79 @@
+import asyncio
+import importlib
+import importlib.abc
+import importlib.util
+import sys
+import time
+
+# 🔹 Extension Manifest (top-level cog modules, registered in this order)
+EXTENSIONS = (
+    "Control",
+    "Loa",
+    "Review",
+    "order-claimed",
+    "ping",
+    "assign",
+    "history",
+)
+
+class PreloadedLoader(importlib.abc.Loader):
+    """Hands discord.py the module imported in parallel instead of executing it a second time (one use only)."""
+    def __init__(self, module, original):
+        self.module = module
+        self.original = original
+
+    def create_module(self, spec):
+        return self.module
+
+    def exec_module(self, module):
+        # Later reloads go through the real loader again
+        module.__spec__.loader = self.original
+
+def lazy_import(name):
+    """Returns module `name` without running it; its code runs on first attribute access."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def preload(name):
+    """Imports an extension module (runs in a worker thread). Returns the import time in ms."""
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    module.__spec__.loader = PreloadedLoader(module, module.__spec__.loader)
+    return (time.perf_counter() - start) * 1000
+
+async def load_extensions(bot, names=EXTENSIONS):
+    """Imports extensions in parallel, then registers them with discord.py one at a time.
+
+    Already-loaded extensions are skipped, so this is safe to call again after a reconnect.
+    Returns (name, import ms, setup ms, error) rows for print_load_table.
+    """
+    pending = [name for name in names if name not in bot.extensions]
+    imports = await asyncio.gather(*(asyncio.to_thread(preload, name) for name in pending), return_exceptions=True)
+
+    rows = []
+    for name, import_ms in zip(pending, imports):
+        if isinstance(import_ms, BaseException):
+            # Serial load_extension below imports it again and reports the real error
+            sys.modules.pop(name, None)
+            import_ms = 0.0
+        start = time.perf_counter()
+        try:
+            await bot.load_extension(name)
+            error = None
+        except Exception as e:
+            error = e
+        rows.append((name, import_ms, (time.perf_counter() - start) * 1000, error))
+    return rows
+
+def print_load_table(rows, total_ms):
+    print(f"{'extension':<16} {'import ms':>10} {'setup ms':>9}  status")
+    for name, import_ms, setup_ms, error in rows:
+        status = f"❌ {error}" if error else "✅"
+        print(f"{name:<16} {import_ms:>10.1f} {setup_ms:>9.1f}  {status}")
+    print(f"⏱️ Extensions: {len(rows)} loaded in {total_ms:.1f}ms (imports in parallel, registration serial)")
\ No newline at end of file
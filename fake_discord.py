@@ -0,0 +1,392 @@
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+import discord
+from metrics import metrics
+
+# 🔹 Offline Discord stand-in for benchmarks (duck-typed guild/channel/member/interaction objects)
+# Real Discord limits scaled by `time_scale` so scenarios finish quickly while keeping their shape.
+DEFAULT_LIMITS = {
+    "POST /channels/{id}/messages": (5, 5.0),  # 5 messages per 5s per channel
+    "PATCH /channels/{id}/messages/{id}": (5, 5.0),
+    "PUT /guilds/{id}/members/{id}/roles/{id}": (10, 10.0),  # per guild
+    "DELETE /guilds/{id}/members/{id}/roles/{id}": (10, 10.0),
+    "GET /guilds/{id}/members/{id}": (10, 10.0),
+    "POST /users/@me/channels": (10, 10.0),
+}
+
+_snowflakes = itertools.count(1400000000000000000)
+
+def snowflake():
+    return next(_snowflakes)
+
+class FakeREST:
+    """Answers REST calls after a configurable latency and simulates per-bucket 429s (with discord.py-style retry)."""
+    def __init__(self, latency=0.05, jitter=0.02, time_scale=1.0, limits=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.time_scale = time_scale
+        self.limits = DEFAULT_LIMITS if limits is None else limits
+        self.buckets = {}  # (route, major id) -> [remaining, reset_at, 429 already sent this window]
+        self.calls = Counter()
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset(self):
+        self.buckets.clear()
+        self.calls.clear()
+        self.rate_limited = 0
+        self.max_in_flight = 0
+
+    async def request(self, route, major=None):
+        limit = self.limits.get(route)
+        while limit:
+            count, per = limit
+            now = time.perf_counter()
+            bucket = self.buckets.setdefault((route, major), [count, now + per * self.time_scale, False])
+            if now >= bucket[1]:
+                bucket[:] = [count, now + per * self.time_scale, False]
+            if bucket[0] > 0:
+                bucket[0] -= 1
+                # Same bookkeeping the metrics trace does from X-RateLimit-* headers on real responses
+                metrics.record_bucket(route, major, bucket[0], bucket[1] - now)
+                break
+            if not bucket[2]:
+                # The first request into an exhausted bucket gets a 429; like discord.py, the rest
+                # of the window's requests wait for the reset without hitting the API
+                bucket[2] = True
+                self.calls[route] += 1
+                self.rate_limited += 1
+                await asyncio.sleep(self.latency * self.time_scale)
+            await asyncio.sleep(max(0.0, bucket[1] - time.perf_counter()))
+
+        self.calls[route] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(max(0.0, (self.latency + random.uniform(-self.jitter, self.jitter)) * self.time_scale))
+        finally:
+            self.in_flight -= 1
+
+class FakeRole:
+    def __init__(self, role_id, name="role", guild=None):
+        self.id = role_id
+        self.name = name
+        self.guild = guild
+        self.mention = f"<@&{role_id}>"
+
+    @property
+    def members(self):
+        return [member for member in self.guild.members.values() if self in member.roles] if self.guild else []
+
+class FakeMessage:
+    def __init__(self, channel, content=None, embeds=None, view=None):
+        self.id = snowflake()
+        self.channel = channel
+        self.content = content
+        self.embeds = list(embeds or [])
+        self.view = view
+        self.author = channel.rest_owner.user
+        self.created_at = datetime.now(timezone.utc)
+        self.sent_at = time.perf_counter()
+
+    async def edit(self, content=discord.utils.MISSING, embed=discord.utils.MISSING, embeds=discord.utils.MISSING, view=discord.utils.MISSING, **kwargs):
+        await self.channel.rest.request("PATCH /channels/{id}/messages/{id}", self.channel.id)
+        if content is not discord.utils.MISSING:
+            self.content = content
+        if embed is not discord.utils.MISSING:
+            self.embeds = [embed] if embed else []
+        if embeds is not discord.utils.MISSING:
+            self.embeds = list(embeds)
+        if view is not discord.utils.MISSING:
+            self.view = view
+        return self
+
+class FakeChannel:
+    def __init__(self, bot, channel_id, name="channel", guild=None):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.rest_owner = bot
+        self.rest = bot.rest
+        self.mention = f"<#{channel_id}>"
+        self.sent = []
+
+    async def send(self, content=None, *, embed=None, embeds=None, view=None, **kwargs):
+        await self.rest.request("POST /channels/{id}/messages", self.id)
+        message = FakeMessage(self, content, [embed] if embed else embeds, view)
+        self.sent.append(message)
+        return message
+
+    async def history(self, limit=100, after=None, oldest_first=None, **kwargs):
+        # Pages of 100 like the real endpoint; sent messages are already oldest first
+        returned = 0
+        for message in self.sent:
+            if limit is not None and returned >= limit:
+                break
+            if after is not None and message.id <= after.id:
+                continue
+            if returned % 100 == 0:
+                await self.rest.request("GET /channels/{id}/messages", self.id)
+            returned += 1
+            yield message
+
+class FakeMember:
+    def __init__(self, guild, member_id=None, roles=(), name=None):
+        self.id = member_id or snowflake()
+        self.guild = guild
+        self.roles = [guild.get_role(role_id) or FakeRole(role_id) for role_id in roles]
+        self.name = self.display_name = name or f"member{self.id % 10000}"
+        self.mention = f"<@{self.id}>"
+        self.bot = False
+        self.dm_channel = None
+
+    async def add_roles(self, *roles, **kwargs):
+        for role in roles:
+            await self.guild.rest.request("PUT /guilds/{id}/members/{id}/roles/{id}", self.guild.id)
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles, **kwargs):
+        for role in roles:
+            await self.guild.rest.request("DELETE /guilds/{id}/members/{id}/roles/{id}", self.guild.id)
+            if role in self.roles:
+                self.roles.remove(role)
+
+    async def send(self, content=None, **kwargs):
+        # discord.py opens the DM channel once, then posts to it
+        if self.dm_channel is None:
+            await self.guild.rest.request("POST /users/@me/channels")
+            self.dm_channel = FakeChannel(self.guild.bot, snowflake(), "dm")
+        return await self.dm_channel.send(content, **kwargs)
+
+class FakeGuild:
+    def __init__(self, bot, guild_id=None):
+        self.id = guild_id or snowflake()
+        self.bot = bot
+        self.rest = bot.rest
+        self.roles = {}
+        self.channels = {}
+        self.members = {}  # discord.py's member cache
+        self.uncached = {}  # Members only REST can see
+        self.member_count = 0
+        self.shard_id = 0
+
+    def add_role(self, role_id, name="role"):
+        self.roles[role_id] = FakeRole(role_id, name, self)
+        return self.roles[role_id]
+
+    def add_channel(self, channel_id, name="channel"):
+        channel = FakeChannel(self.bot, channel_id, name, self)
+        self.channels[channel_id] = channel
+        self.bot.channels[channel_id] = channel
+        return channel
+
+    def add_member(self, roles=(), member_id=None, cached=True):
+        member = FakeMember(self, member_id, roles)
+        self.member_count += 1
+        if cached:
+            self.members[member.id] = member
+        else:
+            self.uncached[member.id] = member
+        return member
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    async def fetch_member(self, member_id):
+        await self.rest.request("GET /guilds/{id}/members/{id}", self.id)
+        member = self.members.get(member_id) or self.uncached.get(member_id)
+        if member is None:
+            raise discord.NotFound(FakeHTTPResponse(404), "Unknown Member")
+        return member
+
+    async def fetch_members(self, limit=1000):
+        # One REST page per 1000 members, like the list members endpoint
+        everyone = list(self.members.values()) + list(self.uncached.values())
+        for start in range(0, len(everyone) if limit is None else min(limit, len(everyone)), 1000):
+            await self.rest.request("GET /guilds/{id}/members", self.id)
+            for member in everyone[start:start + 1000]:
+                yield member
+
+class FakeHTTPResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "fake"
+
+class FakeResponse:
+    """interaction.response stand-in: exactly one acknowledgement per interaction."""
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+        self.kind = None
+        self.modal = None
+        self.deferred = None  # defer() kwargs
+
+    def is_done(self):
+        return self._done
+
+    async def _callback(self, kind):
+        if self._done:
+            raise discord.InteractionResponded(self.interaction)
+        self._done = True
+        self.kind = kind
+        await self.interaction.rest.request("POST /interactions/{id}/{token}/callback")
+        self.interaction.responded_at = time.perf_counter()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._callback("message")
+        self.interaction.sent.append((content, kwargs))
+        if kwargs.get("view") is not None and kwargs["view"].timeout:
+            self.interaction.client.listen(kwargs["view"])
+
+    async def send_modal(self, modal):
+        await self._callback("modal")
+        self.modal = modal
+
+    async def defer(self, **kwargs):
+        await self._callback("defer")
+        self.deferred = kwargs
+
+    async def edit_message(self, **kwargs):
+        await self._callback("edit")
+        message = self.interaction.message
+        if message:
+            if "content" in kwargs:
+                message.content = kwargs["content"]
+            if "embed" in kwargs:
+                message.embeds = [kwargs["embed"]] if kwargs["embed"] else []
+            if "embeds" in kwargs:
+                message.embeds = list(kwargs["embeds"])
+            if "view" in kwargs:
+                message.view = kwargs["view"]
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self.interaction.rest.request("POST /webhooks/{id}/{token}")
+        self.interaction.sent.append((content, kwargs))
+        return FakeMessage(self.interaction.channel, content, [kwargs["embed"]] if kwargs.get("embed") else kwargs.get("embeds"))
+
+class FakeInteraction:
+    def __init__(self, bot, user, channel=None, message=None, kind=discord.InteractionType.application_command):
+        self.id = snowflake()
+        self.client = bot
+        self.rest = bot.rest
+        self.user = user
+        self.guild = user.guild
+        self.guild_id = user.guild.id
+        self.channel = channel or next(iter(user.guild.channels.values()))
+        self.channel_id = self.channel.id
+        self.message = message
+        self.type = kind
+        self.command = None
+        self.extras = {}
+        self.created_at = datetime.now(timezone.utc)
+        self.received_at = time.perf_counter()
+        self.responded_at = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.sent = []
+        self.edits = []  # edit_original_response calls
+        self.original_deleted = False
+
+    async def edit_original_response(self, **kwargs):
+        await self.rest.request("PATCH /webhooks/{id}/{token}/messages/@original")
+        self.edits.append(kwargs)
+        if self.message and "embed" in kwargs:
+            self.message.embeds = [kwargs["embed"]] if kwargs["embed"] else []
+        if self.message and "embeds" in kwargs:
+            self.message.embeds = list(kwargs["embeds"])
+        if self.message and "view" in kwargs:
+            self.message.view = kwargs["view"]
+        return self.message
+
+    async def delete_original_response(self):
+        await self.rest.request("DELETE /webhooks/{id}/{token}/messages/@original")
+        self.original_deleted = True
+
+class FakeBot:
+    """Enough of commands.Bot for the cogs: channel/guild/cog lookup, custom events and a REST stand-in."""
+    def __init__(self, rest=None):
+        self.rest = rest or FakeREST()
+        self.channels = {}
+        self.guild_map = {}
+        self.cogs = {}
+        self.emojis = {}
+        self.latency = 0.042
+        self.user = FakeUserStub(snowflake())
+        self.live_views = {}  # view id -> views with a timeout that are still listening
+
+    def add_guild(self, guild_id=None):
+        guild = FakeGuild(self, guild_id)
+        self.guild_map[guild.id] = guild
+        return guild
+
+    @property
+    def guilds(self):
+        return list(self.guild_map.values())
+
+    async def add_cog(self, cog):
+        self.cogs[type(cog).__cog_name__] = cog
+        await discord.utils.maybe_coroutine(cog.cog_load)
+
+    def add_view(self, view, **kwargs):
+        pass
+
+    def listen(self, view):
+        # Like discord.py's view store: a view with a timeout expires on its own and is dropped once it stops
+        self.live_views[view.id] = view
+        view._start_listening_from_store(self)
+
+    def remove_view(self, view):
+        self.live_views.pop(view.id, None)
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        await self.rest.request("GET /channels/{id}", channel_id)
+        return self.channels[channel_id]
+
+    def get_guild(self, guild_id):
+        return self.guild_map.get(guild_id)
+
+    def get_emoji(self, emoji_id):
+        return self.emojis.get(emoji_id)
+
+    def dispatch(self, event, *args, **kwargs):
+        # Mirrors commands.Bot.dispatch for cog listeners named on_<event>
+        for cog in self.cogs.values():
+            listener = getattr(cog, f"on_{event}", None)
+            if listener:
+                asyncio.create_task(listener(*args, **kwargs))
+
+    async def wait_until_ready(self):
+        return None
+
+    def is_ready(self):
+        return True
+
+class FakeUserStub:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
\ No newline at end of file
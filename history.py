@@ -0,0 +1,89 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from metrics import timed
+import store
+from extensions import lazy_import
+from Control import QC_CHANNEL_ID, QC_RESULTS_CHANNEL_ID
+from Loa import APPROVAL_CHANNEL_ID
+from Review import REVIEW_CHANNEL_ID
+from config import ORDER_LOG_CHANNEL_ID
+
+export = lazy_import("export")  # Export code only runs the first time /history export is used
+
+HISTORY_CHANNEL_IDS = (QC_CHANNEL_ID, QC_RESULTS_CHANNEL_ID, ORDER_LOG_CHANNEL_ID, REVIEW_CHANNEL_ID, APPROVAL_CHANNEL_ID)
+
+# Record kinds (kind, label)
+KIND_LABELS = {
+    "qc_submission": "🛠️ QC Submission",
+    "qc_result": "🧾 QC Result",
+    "claim": "📢 Claim",
+    "assignment": "📌 Assignment",
+    "review": "🌟 Review",
+    "loa_request": "📝 LOA Request",
+    "qc_decision": "⚖️ QC Decision",
+    "loa_decision": "⚖️ LOA Decision",
+}
+
+class History(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.exporting = False
+
+    history = app_commands.Group(name="history", description="Export and search QC, claim, review and LOA history.", default_permissions=discord.Permissions(manage_guild=True))
+
+    @history.command(name="export", description="Export new channel history to compressed JSONL and the search index (Admins only).")
+    @timed()
+    async def history_export(self, interaction: discord.Interaction):
+        """Streams every history channel from its last checkpoint into the export files and the search index."""
+        if self.exporting:
+            await interaction.response.send_message("⏳ An export is already running.", ephemeral=True)
+            return
+
+        channels = [channel for channel in map(self.bot.get_channel, HISTORY_CHANNEL_IDS) if channel]
+        if not channels:
+            await interaction.response.send_message("❌ No history channels found.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        self.exporting = True
+        try:
+            results = await export.export_history(self.bot, channels)
+            decisions = export.export_decisions()
+        finally:
+            self.exporting = False
+
+        lines = [f"{channel.mention}: scanned {scanned}, exported {exported}" for channel, (scanned, exported) in results.items()]
+        lines.append(f"⚖️ Decisions: exported {decisions}")
+        await interaction.followup.send("✅ Export complete.\n" + "\n".join(lines), ephemeral=True)
+
+    @history.command(name="search", description="Search exported history.")
+    @app_commands.describe(query="Words to look for (order IDs, reasons, notes...)", kind="Only this kind of record", member="Only records involving this member")
+    @app_commands.choices(kind=[app_commands.Choice(name=label, value=kind) for kind, label in KIND_LABELS.items()])
+    @timed()
+    async def history_search(self, interaction: discord.Interaction, query: str = "", kind: app_commands.Choice[str] = None, member: discord.Member = None):
+        """Shows the best matching records with links back to their messages."""
+        rows = store.search_history(query, kind.value if kind else None, member.id if member else None)
+        if not rows:
+            await interaction.response.send_message("📭 Nothing found. Run `/history export` to pick up new messages.", ephemeral=True)
+            return
+
+        lines = []
+        for row in rows:
+            link = f"https://discord.com/channels/{interaction.guild_id}/{row['channel_id']}/{row['message_id']}"
+            parts = [f"<t:{row['created_at']}:d>", KIND_LABELS.get(row["kind"], row["kind"])]
+            if row["order_id"]:
+                parts.append(f"**Order {row['order_id']}**")
+            parts.extend(f"<@{person}>" for person in (row["people"] or "").split())
+            if row["status"]:
+                parts.append(row["status"])
+            line = " — ".join(parts) + f" [↗]({link})"
+            if row["text"]:
+                line += f"\n> {row['text'][:100]}"
+            lines.append(line)
+        embed = discord.Embed(title="🔎 History Search", description="\n".join(lines)[:4096], color=discord.Color.blurple())
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# Setup function for bot to load the cog
+async def setup(bot):
+    await bot.add_cog(History(bot))
\ No newline at end of file
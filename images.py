@@ -0,0 +1,193 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import asynccontextmanager
+import aiohttp
+from aiohttp.abc import AbstractResolver
+import discord
+from yarl import URL
+from metrics import metrics
+
+# 🔹 Image Checks (QC submissions)
+CHECK_TIMEOUT = 1.5  # Seconds per URL, so a whole submission is checked well inside the 3s interaction deadline
+CACHE_SIZE = 512  # Checked URLs remembered
+CACHE_TTL = 600.0  # Seconds a good result is trusted
+FAILURE_TTL = 60.0  # Seconds a bad result is trusted (hosts come back)
+SNIFF_BYTES = 16  # Enough for every signature below
+POOL_SIZE = 20  # Pooled connections shared by every check
+MAX_IMAGES = 10  # Links per QC submission
+GALLERY_SIZE = 4  # Discord shows up to 4 embeds sharing a url as one gallery
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"RIFF", "image/webp"),  # RIFF....WEBP, checked below
+)
+
+ImageCheck = namedtuple("ImageCheck", "url ok reason")
+
+class BlockedAddress(OSError):
+    """A link (or one of its redirects) points at a private, loopback or link-local address."""
+
+class PublicResolver(AbstractResolver):
+    """DNS resolver that drops non-public addresses, so a host name can't lead the checker into the bot's own network."""
+    def __init__(self, checker):
+        self.checker = checker
+        self.resolver = aiohttp.DefaultResolver()
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        hosts = [entry for entry in await self.resolver.resolve(host, port, family) if self.checker.is_allowed(entry["host"])]
+        if not hosts:
+            raise BlockedAddress(f"{host} only resolves to private addresses")
+        return hosts
+
+    async def close(self):
+        await self.resolver.close()
+
+class ImageChecker:
+    """Checks image links with HEAD (or a tiny ranged GET) over one pooled session, caching results for a while."""
+    def __init__(self, timeout=CHECK_TIMEOUT, cache_size=CACHE_SIZE, allowed_networks=()):
+        self.timeout = timeout
+        self.allowed_networks = [ipaddress.ip_network(network) for network in allowed_networks]  # Non-public networks that may still be checked
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # url -> (expires at, ImageCheck), least recently used first
+        self.in_flight = {}  # url -> task, so concurrent submissions of one link share a single request
+        self.slots = asyncio.Semaphore(POOL_SIZE)  # One per pooled connection, so a check never waits for a connection inside its timeout
+        self.session = None
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=POOL_SIZE, ttl_dns_cache=300, resolver=PublicResolver(self))
+            self.session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": "SwitchCustomsBot (image check)"})
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def check_all(self, urls):
+        """Checks every URL concurrently; returns ImageChecks in the submitted order."""
+        return await asyncio.gather(*(self.check(url) for url in urls))
+
+    async def check(self, url):
+        cached = self.cache.get(url)
+        if cached and cached[0] > time.monotonic():
+            self.cache.move_to_end(url)
+            metrics.count("image_check_cache_hits")
+            return cached[1]
+        task = self.in_flight.get(url)
+        if task is None:
+            task = self.in_flight[url] = asyncio.ensure_future(self._check(url))
+            task.add_done_callback(lambda _: self.in_flight.pop(url, None))
+        return await asyncio.shield(task)
+
+    def is_allowed(self, address):
+        """Whether an IP address is public (or explicitly allowed)."""
+        ip = ipaddress.ip_address(address)
+        if getattr(ip, "ipv4_mapped", None):
+            ip = ip.ipv4_mapped
+        if any(ip in network for network in self.allowed_networks):
+            return True
+        return ip.is_global and not ip.is_multicast
+
+    async def _check(self, url):
+        # The timeout only starts once a connection is free, so a busy pool doesn't fail good links
+        async with self.slots:
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._fetch(url), self.timeout)
+            except asyncio.TimeoutError:
+                result = ImageCheck(url, False, "timed out")
+            except BlockedAddress:
+                result = ImageCheck(url, False, "private address")
+            except aiohttp.ClientError as e:
+                # The resolver's BlockedAddress arrives wrapped in a connector error
+                blocked = isinstance(e.__cause__, BlockedAddress)
+                result = ImageCheck(url, False, "private address" if blocked else f"unreachable ({type(e).__name__})")
+            except ValueError:
+                result = ImageCheck(url, False, "not a valid URL")
+        metrics.observe("image_check", time.perf_counter() - start)
+        metrics.count("image_check_ok" if result.ok else "image_check_failed")
+
+        self.cache[url] = (time.monotonic() + (CACHE_TTL if result.ok else FAILURE_TTL), result)
+        self.cache.move_to_end(url)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    @asynccontextmanager
+    async def _request(self, method, url, headers=None):
+        """One request, following redirects by hand so every hop's address is checked too."""
+        session = self.get_session()
+        for _ in range(MAX_REDIRECTS + 1):
+            target = URL(url)
+            if target.scheme not in ("http", "https") or not target.host:
+                raise ValueError(url)
+            try:
+                literal = ipaddress.ip_address(target.host)
+            except ValueError:
+                literal = None  # A host name: PublicResolver checks what it resolves to
+            if literal is not None and not self.is_allowed(literal):
+                raise BlockedAddress(target.host)
+            async with session.request(method, target, headers=headers, allow_redirects=False) as response:
+                location = response.headers.get("Location")
+                if response.status not in REDIRECT_STATUSES or not location:
+                    yield response
+                    return
+                url = str(response.url.join(URL(location)))
+        raise aiohttp.TooManyRedirects(response.request_info, (), status=response.status, message="Too many redirects")
+
+    async def _fetch(self, url):
+        if not url.startswith(("http://", "https://")):
+            return ImageCheck(url, False, "not an http(s) link")
+
+        # Headers are usually enough
+        async with self._request("HEAD", url) as response:
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if response.status < 400 and content_type.startswith("image/"):
+                return ImageCheck(url, True, content_type)
+            if response.status >= 400 and response.status not in (403, 405, 501):
+                return ImageCheck(url, False, f"HTTP {response.status}")
+
+        # Some hosts refuse HEAD or send a generic type: read just the first bytes
+        async with self._request("GET", url, headers={"Range": f"bytes=0-{SNIFF_BYTES - 1}"}) as response:
+            if response.status >= 400:
+                return ImageCheck(url, False, f"HTTP {response.status}")
+            head = b""
+            while len(head) < SNIFF_BYTES:
+                chunk = await response.content.read(SNIFF_BYTES - len(head))
+                if not chunk:
+                    break
+                head += chunk
+        kind = sniff(head)
+        if kind:
+            return ImageCheck(url, True, kind)
+        return ImageCheck(url, False, "not an image")
+
+def sniff(head):
+    for signature, kind in SIGNATURES:
+        if head.startswith(signature):
+            if kind == "image/webp" and head[8:12] != b"WEBP":
+                continue
+            return kind
+    return None
+
+def gallery_embeds(embed, image_urls):
+    """Shows up to GALLERY_SIZE images as one gallery under `embed`; any others are listed as links."""
+    embed.url = embed.url or image_urls[0]  # Embeds sharing a url are grouped into one gallery
+    embed.set_image(url=image_urls[0])
+    embeds = [embed]
+    for url in image_urls[1:GALLERY_SIZE]:
+        embeds.append(discord.Embed(url=embed.url).set_image(url=url))
+    extra = image_urls[GALLERY_SIZE:]
+    if extra:
+        embed.add_field(name="🖼️ More Images", value="\n".join(extra)[:1024], inline=False)
+    return embeds
+
+image_checker = ImageChecker()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import os
+from collections import OrderedDict
+import discord
+from config import DESIGNER_ROLE_ID
+from metrics import metrics
+
+# 🔹 Member Cache Policy
+CACHE_MODE = os.getenv("CACHE_MODE", "full").lower()  # "full" = discord.py defaults, "lean" = staff + recently active only
+MEMBER_LRU_SIZE = int(os.getenv("MEMBER_LRU_SIZE", "2000"))  # Recently active non-staff members kept in lean mode
+STAFF_ROLE_IDS = {DESIGNER_ROLE_ID}
+
+def bot_options():
+    """Extra commands.Bot kwargs for the configured cache mode."""
+    if CACHE_MODE != "lean":
+        return {}
+    # Members arrive with every interaction and join event, so neither chunking nor discord.py's member cache is needed
+    return {"chunk_guilds_at_startup": False, "member_cache_flags": discord.MemberCacheFlags.none()}
+
+class MemberCache:
+    """Staff members plus an LRU of recently active members; everyone else is fetched on demand."""
+    def __init__(self, size=MEMBER_LRU_SIZE):
+        self.size = size
+        self.staff = {}  # (guild id, member id) -> Member
+        self.recent = OrderedDict()  # (guild id, member id) -> Member, least recently used first
+        self.counters = {"hits": 0, "misses": 0, "fetches": 0, "evictions": 0}
+
+    def remember(self, member):
+        if not isinstance(member, discord.Member):
+            return
+        key = (member.guild.id, member.id)
+        if any(role.id in STAFF_ROLE_IDS for role in member.roles):
+            self.staff[key] = member
+            self.recent.pop(key, None)
+            return
+        self.staff.pop(key, None)
+        self.recent[key] = member
+        self.recent.move_to_end(key)
+        while len(self.recent) > self.size:
+            self.recent.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def replace_staff(self, guild_id, members):
+        """Swaps a guild's staff for a freshly fetched list, dropping entries whose roles went stale."""
+        for key in [key for key in self.staff if key[0] == guild_id]:
+            del self.staff[key]
+        for member in members:
+            self.remember(member)
+
+    def forget(self, guild_id, member_id):
+        self.staff.pop((guild_id, member_id), None)
+        self.recent.pop((guild_id, member_id), None)
+
+    def get(self, guild, member_id):
+        """Cached member (discord.py's cache first, then ours), or None."""
+        member = guild.get_member(member_id)
+        if member is None:
+            key = (guild.id, member_id)
+            member = self.staff.get(key) or self.recent.get(key)
+            if member is not None and key in self.recent:
+                self.recent.move_to_end(key)
+        self.counters["hits" if member is not None else "misses"] += 1
+        return member
+
+    async def get_or_fetch(self, guild, member_id):
+        """Cached member, or one REST fetch that is then remembered. Raises discord.HTTPException like fetch_member."""
+        member = self.get(guild, member_id)
+        if member is None:
+            self.counters["fetches"] += 1
+            metrics.count("member_fetches")
+            member = await guild.fetch_member(member_id)
+            self.remember(member)
+        return member
+
+    def stats(self):
+        return {**self.counters, "mode": CACHE_MODE, "staff": len(self.staff), "recent": len(self.recent), "recent_limit": self.size}
+
+    # Event listeners
+    async def on_interaction(self, interaction: discord.Interaction):
+        self.remember(interaction.user)
+
+    async def on_member_join(self, member):
+        self.remember(member)
+
+    async def on_member_remove(self, member):
+        self.forget(member.guild.id, member.id)
+
+member_cache = MemberCache()
+
+async def get_member(guild, member_id):
+    """Member by id from cache, fetching it if needed (views keep ids, not stale Member objects)."""
+    return await member_cache.get_or_fetch(guild, member_id)
+
+def setup_member_cache(bot):
+    """Registers the cache listeners in lean mode (called once from bot.py); full mode uses discord.py's cache."""
+    if CACHE_MODE != "lean":
+        return
+    bot.add_listener(member_cache.on_interaction, "on_interaction")
+    bot.add_listener(member_cache.on_member_join, "on_member_join")
+    bot.add_listener(member_cache.on_member_remove, "on_member_remove")
\ No newline at end of file
@@ -0,0 +1,220 @@
+import functools
+import os
+import resource
+import re
+import time
+from collections import defaultdict, deque
+import aiohttp
+from aiohttp import web
+import discord
+
+# 🔹 Metrics Configuration
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 disables the endpoint
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0)  # Seconds (3s = interaction deadline)
+SAMPLES = 1024  # Recent samples kept per histogram for percentiles
+
+class Histogram:
+    """Prometheus-style cumulative histogram plus a window of recent samples for percentiles."""
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.samples.append(seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Returns {p: value} for the given samples (nearest-rank)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {p: 0.0 for p in points}
+    return {p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in points}
+
+class Metrics:
+    def __init__(self):
+        self.handlers = defaultdict(Histogram)  # handler name -> latency
+        self.handler_errors = defaultdict(int)
+        self.first_response = defaultdict(Histogram)  # interaction kind -> time to first response
+        self.rest = defaultdict(Histogram)  # "METHOD /route" -> duration
+        self.rest_status = defaultdict(int)  # ("METHOD /route", status) -> count
+        self.rate_limited = defaultdict(int)  # "METHOD /route" -> 429 count
+        self.counters = defaultdict(int)  # free-form counters from other modules
+        self.timings = defaultdict(Histogram)  # free-form durations from other modules
+        self.buckets = {}  # ("METHOD /route", major id) -> (remaining, reset time) from rate-limit headers
+        self.received = {}  # interaction id -> (receipt time, kind)
+        self.collectors = []  # callables returning {name: value} gauges
+        self.runner = None
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def observe(self, name, seconds):
+        self.timings[name].observe(seconds)
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    # Rate-limit buckets
+    def record_bucket(self, route, major, remaining, reset_after):
+        if len(self.buckets) > 10000:
+            self.buckets.clear()
+        self.buckets[(route, major)] = (remaining, time.perf_counter() + reset_after)
+
+    def bucket_reset(self, route, major):
+        """Returns when an exhausted bucket resets (perf_counter time), or None if requests can go out now."""
+        remaining, reset_at = self.buckets.get((route, major), (1, 0.0))
+        if remaining > 0 or reset_at <= time.perf_counter():
+            return None
+        return reset_at
+
+    # Interactions
+    async def on_interaction(self, interaction: discord.Interaction):
+        # Remember when the interaction arrived so the callback request can be timed against it
+        if len(self.received) > 10000:
+            self.received.clear()
+        self.received[interaction.id] = (time.perf_counter(), interaction.type.name)
+
+    def timed(self, name=None):
+        """Decorator recording the latency of an app command, component callback or modal submit."""
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    self.handler_errors[label] += 1
+                    raise
+                finally:
+                    self.handlers[label].observe(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    # Outbound REST (aiohttp trace hooks)
+    def trace_config(self):
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_request_end.append(self._on_request_end)
+        trace.on_request_exception.append(self._on_request_exception)
+        return trace
+
+    async def _on_request_start(self, session, context, params):
+        context.start = time.perf_counter()
+
+    async def _on_request_end(self, session, context, params):
+        end = time.perf_counter()
+        route = normalize_route(params.method, params.url.path)
+        self.rest[route].observe(end - context.start)
+        self.rest_status[(route, params.response.status)] += 1
+        if params.response.status == 429:
+            self.rate_limited[route] += 1
+        headers = params.response.headers
+        if "X-RateLimit-Remaining" in headers and "X-RateLimit-Reset-After" in headers:
+            major = MAJOR_PATTERN.search(params.url.path)
+            self.record_bucket(route, int(major.group(2)) if major else None, int(headers["X-RateLimit-Remaining"]), float(headers["X-RateLimit-Reset-After"]))
+
+        # Interaction callbacks are the first response to an interaction
+        match = CALLBACK_PATTERN.search(params.url.path)
+        if match:
+            received = self.received.pop(int(match.group(1)), None)
+            if received:
+                self.first_response[received[1]].observe(end - received[0])
+
+    async def _on_request_exception(self, session, context, params):
+        route = normalize_route(params.method, params.url.path)
+        self.rest[route].observe(time.perf_counter() - context.start)
+        self.rest_status[(route, "error")] += 1
+
+    # Summaries
+    def summary(self):
+        """Overall handler and time-to-first-response percentiles in ms, for /ping."""
+        handler_samples = [s for histogram in self.handlers.values() for s in histogram.samples]
+        response_samples = [s for histogram in self.first_response.values() for s in histogram.samples]
+        return {
+            "handlers": {p: v * 1000 for p, v in percentiles(handler_samples).items()},
+            "first_response": {p: v * 1000 for p, v in percentiles(response_samples).items()},
+            "rest_calls": sum(histogram.count for histogram in self.rest.values()),
+            "rate_limited": sum(self.rate_limited.values()),
+        }
+
+    def render(self):
+        """Renders every metric in the Prometheus text format."""
+        lines = []
+        write_histograms(lines, "switch_handler_latency_seconds", "handler", self.handlers)
+        write_histograms(lines, "switch_first_response_seconds", "kind", self.first_response)
+        write_histograms(lines, "switch_rest_request_seconds", "route", self.rest)
+        write_histograms(lines, "switch_timing_seconds", "name", self.timings)
+        lines.append("# TYPE switch_handler_errors_total counter")
+        for label, value in self.handler_errors.items():
+            lines.append(f'switch_handler_errors_total{{handler="{label}"}} {value}')
+        lines.append("# TYPE switch_rest_responses_total counter")
+        for (route, status), value in self.rest_status.items():
+            lines.append(f'switch_rest_responses_total{{route="{route}",status="{status}"}} {value}')
+        lines.append("# TYPE switch_rest_rate_limited_total counter")
+        for route, value in self.rate_limited.items():
+            lines.append(f'switch_rest_rate_limited_total{{route="{route}"}} {value}')
+        lines.append("# TYPE switch_events_total counter")
+        for name, value in self.counters.items():
+            lines.append(f'switch_events_total{{name="{name}"}} {value}')
+        lines.append("# TYPE switch_gauge gauge")
+        for collector in self.collectors:
+            for name, value in collector().items():
+                if isinstance(value, (int, float)):
+                    lines.append(f'switch_gauge{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    # HTTP endpoint
+    async def start_server(self):
+        """Serves /metrics on METRICS_HOST:METRICS_PORT (idempotent, safe on reconnect)."""
+        if self.runner or not METRICS_PORT:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, METRICS_HOST, METRICS_PORT).start()
+        print(f"📈 Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+    async def _handle_metrics(self, request):
+        return web.Response(text=self.render(), content_type="text/plain")
+
+# 🔹 REST route normalization (ids and tokens collapsed so routes aggregate)
+CALLBACK_PATTERN = re.compile(r"/interactions/(\d+)/[^/]+/callback")
+TOKEN_PATTERN = re.compile(r"/(interactions|webhooks)/(\d+)/[^/]+")
+ID_PATTERN = re.compile(r"/\d{15,}")
+MAJOR_PATTERN = re.compile(r"/(channels|guilds|webhooks)/(\d+)")
+
+def rss_bytes():
+    """Current resident set size (Linux), falling back to the peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def normalize_route(method, path):
+    path = re.sub(r"^/api/v\d+", "", path)
+    path = TOKEN_PATTERN.sub(r"/\1/{id}/{token}", path)
+    path = ID_PATTERN.sub("/{id}", path)
+    return f"{method} {path}"
+
+def write_histograms(lines, metric, label, histograms):
+    lines.append(f"# TYPE {metric} histogram")
+    for name, histogram in histograms.items():
+        for bound, count in zip(BUCKETS, histogram.bucket_counts):
+            lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {count}')
+        lines.append(f'{metric}_bucket{{{label}="{name}",le="+Inf"}} {histogram.count}')
+        lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.sum}')
+        lines.append(f'{metric}_count{{{label}="{name}"}} {histogram.count}')
+
+metrics = Metrics()
+timed = metrics.timed
\ No newline at end of file
@@ -1,10 +1,51 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+from metrics import timed
+from deadline import guarded, respond
+from dispatch import outbox
+import store
+import permissions
+from config import DESIGNER_ROLE_ID, ORDER_LOG_CHANNEL_ID
 
-# Role & Channel IDs
-DESIGNER_ROLE_ID = 1342201759111712799  # Designer role (Temporairily changed for testing 1342201759111712799 is actual id)
-ORDER_LOG_CHANNEL_ID = 1342230845032894514  # Order log channel (to be changed)
+PAGE_SIZE = 10  # Orders per page in /orders
+
+STATUS_LABELS = {
+    "claimed": "🛠️ Claimed",
+    "in_qc": "🔍 In QC",
+    "denied": "❌ QC Denied",
+    "approved": "✅ Approved",
+}
+
+def format_order(order):
+    return f"**{order['order_id']}** — {STATUS_LABELS.get(order['status'], order['status'])} — <@{order['designer_id']}> — <t:{order['updated_at']}:R>"
+
+class OrderPageView(discord.ui.View):
+    """Keyset-paginated order list; each page continues after the last row of the previous one."""
+    def __init__(self, title, designer_id=None, open_only=False):
+        super().__init__(timeout=180)
+        self.title = title
+        self.designer_id = designer_id
+        self.open_only = open_only
+        self.after = None
+
+    def next_page(self):
+        # Fetch one extra row to know whether there is another page
+        orders = store.list_orders(self.designer_id, self.open_only, self.after, PAGE_SIZE + 1)
+        has_more = len(orders) > PAGE_SIZE
+        orders = orders[:PAGE_SIZE]
+        if orders:
+            self.after = (orders[-1]["updated_at"], orders[-1]["order_id"])
+        self.next_button.disabled = not has_more
+
+        embed = discord.Embed(title=self.title, color=discord.Color.green())
+        embed.description = "\n".join(format_order(order) for order in orders) or "📭 No orders found."
+        return embed
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.grey)
+    @timed()
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(embed=self.next_page(), view=self)
 
 class ClaimOrder(commands.Cog):
     def __init__(self, bot):
@@ -12,17 +53,25 @@ class ClaimOrder(commands.Cog):
 
     @app_commands.command(name="claim", description="Claim an order as a designer.")
     @app_commands.describe(order_id="The ID of the order you are claiming.")
+    @permissions.require_role(DESIGNER_ROLE_ID, "❌ You must be a **Designer** to claim an order.")
+    @timed()
+    @guarded(ephemeral=False)
     async def claim(self, interaction: discord.Interaction, order_id: str):
         """Claim an order and log it."""
 
-        # Check if user has the Designer role
-        if not any(role.id == DESIGNER_ROLE_ID for role in interaction.user.roles):
-            return await interaction.response.send_message("❌ You must be a **Designer** to claim an order.", ephemeral=True)
-
         # Fetch logging channel
         log_channel = interaction.guild.get_channel(ORDER_LOG_CHANNEL_ID)
         if not log_channel:
-            return await interaction.response.send_message("⚠️ Order log channel not found.", ephemeral=True)
+            return await respond(interaction, "⚠️ Order log channel not found.", ephemeral=True)
+
+        # Atomically register the claim (first designer wins)
+        claimed, order = store.claim_order(order_id, interaction.user.id, interaction.channel.id)
+        if claimed:
+            self.bot.dispatch("order_claimed", order)
+        else:
+            if order["designer_id"] == interaction.user.id:
+                return await respond(interaction, f"⚠️ You already claimed **Order {order_id}**.", ephemeral=True)
+            return await respond(interaction, f"❌ **Order {order_id}** is already claimed by <@{order['designer_id']}>.", ephemeral=True)
 
         # Order channel link
         order_channel_link = f"https://discord.com/channels/{interaction.guild.id}/{interaction.channel.id}"
@@ -36,11 +85,45 @@ class ClaimOrder(commands.Cog):
         embed.set_footer(text="Order has been claimed successfully.")
 
         # Send embed in the current channel
-        await interaction.response.send_message(embed=embed)
+        await respond(interaction, embed=embed)
 
         # Log the claim in the order log channel
         claim_message = f"📢 **Order Claimed**: {interaction.user.mention} claimed **Order {order_id}** in [#{order_channel_name}]({order_channel_link})."
-        await log_channel.send(claim_message)
+        outbox.send(log_channel, claim_message)
+
+    orders = app_commands.Group(name="orders", description="Browse claimed orders.")
+
+    @orders.command(name="mine", description="List the orders you have claimed.")
+    @timed()
+    async def orders_mine(self, interaction: discord.Interaction):
+        """Lists the caller's orders, newest first."""
+        view = OrderPageView("📋 Your Orders", designer_id=interaction.user.id)
+        await interaction.response.send_message(embed=view.next_page(), view=view, ephemeral=True)
+
+    @orders.command(name="open", description="List orders that are not approved yet.")
+    @timed()
+    async def orders_open(self, interaction: discord.Interaction):
+        """Lists every open order (claimed, in QC or denied), newest first."""
+        view = OrderPageView("📂 Open Orders", open_only=True)
+        await interaction.response.send_message(embed=view.next_page(), view=view, ephemeral=True)
+
+    @app_commands.command(name="order", description="Look up who owns an order and its status.")
+    @app_commands.describe(order_id="The ID of the order to look up.")
+    @timed()
+    async def order(self, interaction: discord.Interaction, order_id: str):
+        """Shows a single order from the registry."""
+        order = store.get_order(order_id)
+        if not order:
+            return await interaction.response.send_message(f"⚠️ **Order {order_id}** has not been claimed.", ephemeral=True)
+
+        embed = discord.Embed(title=f"📦 Order {order_id}", color=discord.Color.green())
+        embed.add_field(name="Designer", value=f"<@{order['designer_id']}>", inline=True)
+        embed.add_field(name="Status", value=STATUS_LABELS.get(order["status"], order["status"]), inline=True)
+        if order["channel_id"]:
+            embed.add_field(name="Channel", value=f"<#{order['channel_id']}>", inline=False)
+        embed.add_field(name="Claimed", value=f"<t:{order['claimed_at']}:F>", inline=True)
+        embed.add_field(name="Updated", value=f"<t:{order['updated_at']}:R>", inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # Setup function for bot to load the cog
 async def setup(bot):
@@ -0,0 +1,110 @@
+import time
+import traceback
+from collections import defaultdict
+import discord
+from discord import app_commands
+from config import ROLE_NAMES
+from members import CACHE_MODE
+
+# 🔹 Shared Role Permission Layer
+class MissingRole(app_commands.CheckFailure):
+    """Raised by require_role; the tree error handler replies with the message."""
+    def __init__(self, role_id, message):
+        super().__init__(message)
+        self.role_id = role_id
+        self.message = message
+
+class RoleCache:
+    """Per-guild cache of member id -> frozenset(role ids), invalidated by member/role events."""
+    def __init__(self):
+        self.guilds = defaultdict(dict)
+        self.enabled = True
+        self.counters = {"checks": 0, "hits": 0, "misses": 0, "check_ms_total": 0.0, "check_ms_max": 0.0}
+        self.denied = defaultdict(int)
+
+    def role_ids(self, member):
+        if not self.enabled:
+            self.counters["misses"] += 1
+            return frozenset(role.id for role in member.roles)
+        guild_cache = self.guilds[member.guild.id]
+        roles = guild_cache.get(member.id)
+        if roles is None:
+            self.counters["misses"] += 1
+            roles = guild_cache[member.id] = frozenset(role.id for role in member.roles)
+        else:
+            self.counters["hits"] += 1
+        return roles
+
+    def has_role(self, member, role_id):
+        start = time.perf_counter()
+        # Users outside a guild (DMs) have no roles
+        allowed = getattr(member, "guild", None) is not None and role_id in self.role_ids(member)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.counters["checks"] += 1
+        self.counters["check_ms_total"] += elapsed
+        self.counters["check_ms_max"] = max(self.counters["check_ms_max"], elapsed)
+        if not allowed:
+            self.denied[ROLE_NAMES.get(role_id, str(role_id))] += 1
+        return allowed
+
+    def invalidate(self, guild_id, member_id=None):
+        if member_id is None:
+            self.guilds.pop(guild_id, None)
+        else:
+            self.guilds[guild_id].pop(member_id, None)
+
+    def stats(self):
+        checks = self.counters["checks"]
+        return {
+            **self.counters,
+            "check_ms_avg": self.counters["check_ms_total"] / checks if checks else 0.0,
+            "cached_members": sum(len(members) for members in self.guilds.values()),
+            "denied": dict(self.denied),
+        }
+
+    # Event listeners
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.invalidate(after.guild.id, after.id)
+
+    async def on_member_remove(self, member):
+        self.invalidate(member.guild.id, member.id)
+
+    async def on_guild_role_delete(self, role):
+        self.invalidate(role.guild.id)
+
+role_cache = RoleCache()
+
+def has_role(member, role_id):
+    """O(1) role check for buttons/modals and anything else outside app-command checks."""
+    return role_cache.has_role(member, role_id)
+
+def require_role(role_id, message):
+    """App-command check decorator: only members with the role may run the command."""
+    async def predicate(interaction: discord.Interaction):
+        if role_cache.has_role(interaction.user, role_id):
+            return True
+        raise MissingRole(role_id, message)
+    return app_commands.check(predicate)
+
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    """Tree error handler: replies to failed role checks, prints everything else."""
+    if isinstance(error, MissingRole):
+        if interaction.response.is_done():
+            await interaction.followup.send(error.message, ephemeral=True)
+        else:
+            await interaction.response.send_message(error.message, ephemeral=True)
+        return
+    command = interaction.command.qualified_name if interaction.command else "unknown"
+    print(f"❌ Error in command '{command}':")
+    traceback.print_exception(type(error), error, error.__traceback__)
+
+def setup_permissions(bot):
+    """Registers the cache-invalidation listeners and the tree error handler."""
+    bot.add_listener(role_cache.on_member_update, "on_member_update")
+    bot.add_listener(role_cache.on_member_remove, "on_member_remove")
+    bot.add_listener(role_cache.on_guild_role_delete, "on_guild_role_delete")
+    bot.tree.error(on_app_command_error)
+    # Lean member cache: on_member_update only fires for cached members, so role sets are
+    # rebuilt from each interaction's member instead of risking stale permissions
+    role_cache.enabled = CACHE_MODE != "lean"
\ No newline at end of file
@@ -1,16 +1,99 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+import asyncio
+import time
+from collections import Counter
+from metrics import timed, metrics, percentiles, rss_bytes
+from dispatch import outbox
+from members import member_cache
+from shards import shard_latencies, WORKER_ID
+import store
+
+# 🔹 Shard Reports (each worker writes its shards to the store so /ping shows every process)
+SHARD_REPORT_EVERY = 30  # Seconds between reports
+SHARD_STALE_AFTER = 3 * SHARD_REPORT_EVERY  # A shard not reported for this long is flagged
+SHARD_LINES = 10  # Shards listed in /ping
 
 class PingCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.task = None
+
+    async def cog_load(self):
+        self.task = asyncio.create_task(self._report())
+
+    def cog_unload(self):
+        if self.task:
+            self.task.cancel()
+
+    async def _report(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self.report_shards()
+            await asyncio.sleep(SHARD_REPORT_EVERY)
+
+    def report_shards(self):
+        guilds = Counter(guild.shard_id for guild in self.bot.guilds)
+        shards = [(shard_id, latency * 1000 if latency is not None else None, guilds[shard_id]) for shard_id, latency in shard_latencies(self.bot)]
+        store.report_shards(WORKER_ID, shards)
 
     @app_commands.command(name="ping", description="Check the bot's latency.")
+    @timed()
     async def ping(self, interaction: discord.Interaction):
         """Replies with Pong! and bot latency."""
         latency = round(self.bot.latency * 1000)  # Convert to ms
-        await interaction.response.send_message(f"🏓 Pong! Latency: {latency}ms", ephemeral=True)
+        message = f"🏓 Pong! Latency: {latency}ms"
+
+        # Join pipeline counters (queue depth and welcome flush latency)
+        pipeline = getattr(self.bot, "join_pipeline", None)
+        if pipeline:
+            stats = pipeline.stats()
+            message += f"\n👋 Joins queued: {stats['join_queue']} | Roles queued: {stats['role_queue']} | Last flush: {stats['last_flush_ms']:.0f}ms"
+
+        # Handler latency and time-to-first-response percentiles
+        summary = metrics.summary()
+        handlers, first = summary["handlers"], summary["first_response"]
+        message += f"\n⏱️ Handlers p50/p95/p99: {handlers[50]:.0f}/{handlers[95]:.0f}/{handlers[99]:.0f}ms"
+        message += f"\n📨 First response p50/p95/p99: {first[50]:.0f}/{first[95]:.0f}/{first[99]:.0f}ms"
+        message += f"\n🌐 REST calls: {summary['rest_calls']} | 429s: {summary['rate_limited']}"
+
+        # Outbound dispatcher (sends merged per message, queue wait)
+        stats, wait = outbox.stats(), percentiles(metrics.timings["outbox_queue_wait"].samples)
+        message += f"\n📬 Outbox merge ratio: {stats['merge_ratio']:.2f} | Queued: {stats['queued']} | Wait p95: {wait[95] * 1000:.0f}ms"
+
+        # Every worker's shards (this one's are refreshed first)
+        self.report_shards()
+        shards, now = store.load_shards(), time.time()
+        if len(shards) > 1:
+            message += "\n🧩 Shards:"
+            for shard in shards[:SHARD_LINES]:
+                latency = f"{shard['latency_ms']:.0f}ms" if shard["latency_ms"] is not None else "connecting"
+                stale = " ⚠️ stale" if now - shard["updated_at"] > SHARD_STALE_AFTER else ""
+                message += f"\n#{shard['shard_id']} (worker {shard['worker_id']}): {latency} | {shard['guilds']} guilds{stale}"
+            if len(shards) > SHARD_LINES:
+                message += f"\n… and {len(shards) - SHARD_LINES} more"
+
+        await interaction.response.send_message(message, ephemeral=True)
+
+    @app_commands.command(name="memory", description="Show memory use and member cache stats (Admins only).")
+    @app_commands.default_permissions(manage_guild=True)
+    @timed()
+    async def memory(self, interaction: discord.Interaction):
+        """Reports RSS, startup time and member cache sizes, to compare CACHE_MODE=full and lean."""
+        stats = member_cache.stats()
+        cached = sum(len(guild.members) for guild in self.bot.guilds)
+        members = sum(guild.member_count or 0 for guild in self.bot.guilds)
+        ready_ms = getattr(self.bot, "ready_ms", None)
+
+        embed = discord.Embed(title="🧠 Memory", color=discord.Color.blurple())
+        embed.add_field(name="RSS", value=f"{rss_bytes() / 1024 / 1024:.1f} MiB", inline=True)
+        embed.add_field(name="Startup", value=f"{ready_ms:.0f}ms to ready" if ready_ms else "n/a", inline=True)
+        embed.add_field(name="Cache Mode", value=stats["mode"], inline=True)
+        embed.add_field(name="discord.py Members", value=f"{cached} cached of {members}", inline=True)
+        embed.add_field(name="Lean Cache", value=f"{stats['staff']} staff | {stats['recent']}/{stats['recent_limit']} recent", inline=True)
+        embed.add_field(name="Lookups", value=f"{stats['hits']} hits | {stats['misses']} misses | {stats['fetches']} fetches", inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # 🔹 Fix: Add the setup function
 async def setup(bot):
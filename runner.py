@@ -0,0 +1,112 @@
+import asyncio
+import math
+import os
+import signal
+import sys
+import time
+import aiohttp
+from config import TOKEN
+
+# 🔹 Production Runner (worker processes, each running a contiguous range of shards)
+WORKERS = int(os.getenv("WORKERS", str(os.cpu_count() or 1)))  # Upper bound; never more workers than shards
+SHARD_COUNT = os.getenv("SHARD_COUNT", "auto")  # "auto" = Discord's recommended count
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+GATEWAY_TIMEOUT = 10.0  # Seconds before falling back to 1 shard
+IDENTIFY_INTERVAL = 5.0  # Seconds Discord wants between identifies in one concurrency bucket
+RESTART_DELAY = 1.0  # First restart delay, doubled after every crash
+MAX_RESTART_DELAY = 300.0
+STABLE_AFTER = 60.0  # A worker that ran this long restarts with the first delay again
+
+async def recommended_shards(token):
+    """Returns (shard count, identify max_concurrency) from the gateway, or (1, 1) if it can't be reached."""
+    try:
+        async with aiohttp.ClientSession(headers={"Authorization": f"Bot {token}"}, timeout=aiohttp.ClientTimeout(total=GATEWAY_TIMEOUT)) as session:
+            async with session.get(GATEWAY_URL) as response:
+                response.raise_for_status()
+                data = await response.json()
+        return data["shards"], data["session_start_limit"]["max_concurrency"]
+    except (aiohttp.ClientError, asyncio.TimeoutError, KeyError) as e:
+        print(f"⚠️ Could not get the recommended shard count ({e}); running 1 shard")
+        return 1, 1
+
+def shard_ranges(shard_count, workers):
+    """Splits shards into at most `workers` contiguous, near-equal ranges."""
+    workers = max(1, min(workers, shard_count))
+    return [list(range(index * shard_count // workers, (index + 1) * shard_count // workers)) for index in range(workers)]
+
+class Runner:
+    """Starts one bot.py process per shard range and restarts crashed ones with exponential backoff."""
+    def __init__(self, shard_count, max_concurrency=1, workers=WORKERS, script=BOT_SCRIPT):
+        self.shard_count = shard_count
+        self.max_concurrency = max_concurrency
+        self.ranges = shard_ranges(shard_count, workers)
+        self.script = script
+        self.processes = {}  # worker id -> running process
+        self.restarts = {}  # worker id -> crash count
+        self.stopping = asyncio.Event()
+
+    def worker_env(self, worker_id, shard_ids):
+        env = dict(os.environ, WORKER_ID=str(worker_id), SHARD_COUNT=str(self.shard_count), SHARD_IDS=",".join(map(str, shard_ids)))
+        # Every worker serves its own /metrics endpoint
+        metrics_port = int(os.getenv("METRICS_PORT", "9108"))
+        if metrics_port:
+            env["METRICS_PORT"] = str(metrics_port + worker_id)
+        return env
+
+    async def supervise(self, worker_id, shard_ids, start_delay):
+        # Workers start staggered so their identifies don't collide in Discord's concurrency buckets
+        await self.pause(start_delay)
+        delay = RESTART_DELAY
+        while not self.stopping.is_set():
+            started = time.monotonic()
+            process = self.processes[worker_id] = await asyncio.create_subprocess_exec(sys.executable, self.script, env=self.worker_env(worker_id, shard_ids))
+            print(f"🚀 Worker {worker_id} (pid {process.pid}) running shards {shard_ids[0]}-{shard_ids[-1]} of {self.shard_count}")
+            code = await process.wait()
+            self.processes.pop(worker_id, None)
+            if self.stopping.is_set():
+                break
+            if time.monotonic() - started >= STABLE_AFTER:
+                delay = RESTART_DELAY
+            self.restarts[worker_id] = self.restarts.get(worker_id, 0) + 1
+            print(f"💥 Worker {worker_id} exited with code {code}; restart #{self.restarts[worker_id]} in {delay:.0f}s")
+            await self.pause(delay)
+            delay = min(delay * 2, MAX_RESTART_DELAY)
+
+    async def pause(self, seconds):
+        """Sleeps, but wakes up early when the runner is stopping."""
+        try:
+            await asyncio.wait_for(self.stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def stop(self):
+        """Stops restarting workers and asks the running ones to shut down."""
+        self.stopping.set()
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.terminate()
+
+    async def run(self):
+        tasks = []
+        start_delay = 0.0
+        for worker_id, shard_ids in enumerate(self.ranges):
+            tasks.append(asyncio.create_task(self.supervise(worker_id, shard_ids, start_delay)))
+            start_delay += math.ceil(len(shard_ids) / self.max_concurrency) * IDENTIFY_INTERVAL
+        await asyncio.gather(*tasks)
+
+async def main():
+    if SHARD_COUNT == "auto":
+        shard_count, max_concurrency = await recommended_shards(TOKEN)
+    else:
+        shard_count, max_concurrency = int(SHARD_COUNT), 1
+    runner = Runner(shard_count, max_concurrency)
+    print(f"🧩 {shard_count} shards across {len(runner.ranges)} workers")
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, runner.stop)
+    await runner.run()
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,38 @@
+import math
+import os
+from discord.ext import commands
+
+# 🔹 Sharding (set per worker process by runner.py; unset = one plain commands.Bot, as before)
+SHARD_COUNT = os.getenv("SHARD_COUNT", "")  # "" = no sharding, "auto" = discord.py picks, or a number
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv("SHARD_IDS", "").split(",") if shard_id.strip()]  # Empty = every shard
+WORKER_ID = int(os.getenv("WORKER_ID", "0"))
+
+def bot_class():
+    return commands.AutoShardedBot if SHARD_COUNT else commands.Bot
+
+def shard_options():
+    """Extra commands.Bot kwargs for the shards this process runs."""
+    if not SHARD_COUNT or SHARD_COUNT == "auto":
+        return {}
+    return {"shard_count": int(SHARD_COUNT), "shard_ids": SHARD_IDS or None}
+
+def shard_for(guild_id, shard_count):
+    """Discord's guild -> shard mapping."""
+    return (guild_id >> 22) % shard_count
+
+def owns_guild(bot, guild_id):
+    """Whether this process runs the shard for a guild (always true without explicit shard ids)."""
+    shard_ids = getattr(bot, "shard_ids", None)
+    if not shard_ids or not bot.shard_count:
+        return True
+    return shard_for(guild_id, bot.shard_count) in shard_ids
+
+def is_primary(bot):
+    """One process per deployment does global work such as syncing slash commands: the one running shard 0."""
+    shard_ids = getattr(bot, "shard_ids", None)
+    return not shard_ids or 0 in shard_ids
+
+def shard_latencies(bot):
+    """(shard id, seconds or None) for every shard this process runs."""
+    latencies = getattr(bot, "latencies", None) or [(getattr(bot, "shard_id", None) or 0, bot.latency)]
+    return [(shard_id, latency if math.isfinite(latency) else None) for shard_id, latency in latencies]
\ No newline at end of file
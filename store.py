@@ -0,0 +1,411 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+# 🔹 Local State Store (SQLite in WAL mode, survives restarts/redeploys)
+STORE_PATH = os.getenv("STORE_PATH", "switch_customs.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_views (
+    message_id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pending_views_kind ON pending_views (kind, message_id);
+CREATE TABLE IF NOT EXISTS decisions (
+    message_id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    decided_by INTEGER NOT NULL,
+    decided_at REAL NOT NULL,
+    channel_id INTEGER,
+    payload TEXT,
+    reason TEXT
+);
+CREATE TABLE IF NOT EXISTS loas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active'
+);
+CREATE INDEX IF NOT EXISTS idx_loas_active ON loas (status, end_ts);
+CREATE INDEX IF NOT EXISTS idx_loas_user ON loas (guild_id, user_id, status);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    designer_id INTEGER NOT NULL,
+    channel_id INTEGER,
+    status TEXT NOT NULL,
+    claimed_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    product TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_designer ON orders (designer_id, updated_at, order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_open ON orders (updated_at, order_id) WHERE status IN ('claimed', 'in_qc', 'denied');
+CREATE TABLE IF NOT EXISTS qc_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    designer_id INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    decided_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_qc_results_recent ON qc_results (decided_at, designer_id, passed);
+CREATE TABLE IF NOT EXISTS reviews (
+    message_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    designer_id INTEGER NOT NULL,
+    reviewer_id INTEGER,
+    product TEXT NOT NULL,
+    stars INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    PRIMARY KEY (message_id, position)
+);
+CREATE TABLE IF NOT EXISTS rating_totals (
+    designer_id INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    sum INTEGER NOT NULL DEFAULT 0,
+    s1 INTEGER NOT NULL DEFAULT 0,
+    s2 INTEGER NOT NULL DEFAULT 0,
+    s3 INTEGER NOT NULL DEFAULT 0,
+    s4 INTEGER NOT NULL DEFAULT 0,
+    s5 INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (designer_id, product)
+);
+CREATE INDEX IF NOT EXISTS idx_rating_totals_avg ON rating_totals (product, (sum * 1.0 / count) DESC);
+CREATE TABLE IF NOT EXISTS rating_daily (
+    designer_id INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    sum INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (designer_id, product, day)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS history USING fts5 (
+    kind, order_id, people, product, status, text,
+    created_at UNINDEXED, channel_id UNINDEXED, message_id UNINDEXED
+);
+CREATE TABLE IF NOT EXISTS shard_status (
+    shard_id INTEGER PRIMARY KEY,
+    worker_id INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    latency_ms REAL,
+    guilds INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Columns added after a table was first created (table, column, statement)
+MIGRATIONS = (
+    ("orders", "product", "ALTER TABLE orders ADD COLUMN product TEXT"),
+    ("decisions", "channel_id", "ALTER TABLE decisions ADD COLUMN channel_id INTEGER"),
+    ("decisions", "payload", "ALTER TABLE decisions ADD COLUMN payload TEXT"),
+    ("decisions", "reason", "ALTER TABLE decisions ADD COLUMN reason TEXT"),
+)
+
+_connection = None
+
+def get_connection():
+    """Returns the shared SQLite connection, creating the schema on first use."""
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(STORE_PATH, isolation_level=None, check_same_thread=False)
+        _connection.row_factory = sqlite3.Row
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("PRAGMA synchronous=NORMAL")
+        _connection.execute("PRAGMA busy_timeout=5000")  # Worker processes share the file; writers wait for each other
+        _connection.executescript(SCHEMA)
+        for table, column, statement in MIGRATIONS:
+            if column not in {row["name"] for row in _connection.execute(f"PRAGMA table_info({table})")}:
+                _connection.execute(statement)
+    return _connection
+
+@contextmanager
+def transaction():
+    """Runs a block of statements atomically (the connection is in autocommit mode otherwise)."""
+    db = get_connection()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield db
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
+
+# 🔹 Small key/value settings (hashes, checkpoints)
+def get_value(key, default=None):
+    row = get_connection().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else default
+
+def set_value(key, value):
+    get_connection().execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (key, str(value)))
+
+# 🔹 Shard heartbeats (every worker process reports its own shards)
+def report_shards(worker_id, shards):
+    """Replaces this worker's shard rows; `shards` is [(shard id, latency ms or None, guild count)]."""
+    now, pid = time.time(), os.getpid()
+    with transaction() as db:
+        db.executemany(
+            "INSERT OR REPLACE INTO shard_status (shard_id, worker_id, pid, latency_ms, guilds, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(shard_id, worker_id, pid, latency_ms, guilds, now) for shard_id, latency_ms, guilds in shards],
+        )
+
+def load_shards():
+    return [dict(row) for row in get_connection().execute("SELECT * FROM shard_status ORDER BY shard_id")]
+
+# 🔹 Pending Approve/Deny decisions, keyed by message ID
+def save_pending(message_id, kind, channel_id, payload):
+    """Stores the state a persistent view needs to handle a button click later."""
+    get_connection().execute(
+        "INSERT OR REPLACE INTO pending_views (message_id, kind, channel_id, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+        (message_id, kind, channel_id, json.dumps(payload), time.time()),
+    )
+
+def get_pending(message_id):
+    """Returns the stored payload for a message, or None if it was already decided."""
+    row = get_connection().execute("SELECT payload FROM pending_views WHERE message_id = ?", (message_id,)).fetchone()
+    return json.loads(row["payload"]) if row else None
+
+def delete_pending(message_id):
+    get_connection().execute("DELETE FROM pending_views WHERE message_id = ?", (message_id,))
+
+def load_pending(kind):
+    """Loads every open decision of one kind in a single indexed query."""
+    rows = get_connection().execute(
+        "SELECT message_id, payload FROM pending_views WHERE kind = ? ORDER BY message_id", (kind,)
+    ).fetchall()
+    return {row["message_id"]: json.loads(row["payload"]) for row in rows}
+
+def decide(message_id, kind, outcome, decided_by, reason=None):
+    """Records the first decision on a message and clears its pending state atomically. Returns (won, decision).
+
+    The pending payload (order, requester...) moves into the decision so the history export can tell what was decided.
+    """
+    with transaction() as db:
+        pending = db.execute("SELECT channel_id, payload FROM pending_views WHERE message_id = ?", (message_id,)).fetchone()
+        cursor = db.execute(
+            "INSERT INTO decisions (message_id, kind, outcome, decided_by, decided_at, channel_id, payload, reason) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (message_id) DO NOTHING",
+            (message_id, kind, outcome, decided_by, time.time(), pending["channel_id"] if pending else None, pending["payload"] if pending else None, reason),
+        )
+        won = cursor.rowcount == 1
+        if won:
+            db.execute("DELETE FROM pending_views WHERE message_id = ?", (message_id,))
+    return won, get_decision(message_id)
+
+def get_decision(message_id):
+    row = get_connection().execute("SELECT * FROM decisions WHERE message_id = ?", (message_id,)).fetchone()
+    return dict(row) if row else None
+
+def decisions_after(after, limit):
+    """Decisions in the order they were made, after a (decided_at, message_id) keyset checkpoint."""
+    rows = get_connection().execute(
+        "SELECT * FROM decisions WHERE (decided_at, message_id) > (?, ?) ORDER BY decided_at, message_id LIMIT ?", (*after, limit)
+    ).fetchall()
+    return [dict(row) for row in rows]
+# 🔹 Approved LOAs and their expiry timestamps
+def add_loa(guild_id, user_id, reason, end_ts):
+    """Records an approved LOA (replacing any active one for the member) and returns its row."""
+    now = int(time.time())
+    with transaction() as db:
+        db.execute("UPDATE loas SET status = 'replaced' WHERE guild_id = ? AND user_id = ? AND status = 'active'", (guild_id, user_id))
+        cursor = db.execute(
+            "INSERT INTO loas (guild_id, user_id, reason, start_ts, end_ts) VALUES (?, ?, ?, ?, ?)",
+            (guild_id, user_id, reason, now, end_ts),
+        )
+    return dict(db.execute("SELECT * FROM loas WHERE id = ?", (cursor.lastrowid,)).fetchone())
+
+def load_active_loas():
+    """Loads every active LOA in one indexed query, earliest expiry first."""
+    rows = get_connection().execute("SELECT * FROM loas WHERE status = 'active' ORDER BY end_ts").fetchall()
+    return [dict(row) for row in rows]
+
+def finish_loas(loa_ids, status):
+    """Marks LOAs as expired/ended in a single transaction."""
+    with transaction() as db:
+        db.executemany("UPDATE loas SET status = ? WHERE id = ? AND status = 'active'", [(status, loa_id) for loa_id in loa_ids])
+# 🔹 Order registry (claims and QC progress)
+OPEN_ORDER_STATUSES = ("claimed", "in_qc", "denied")
+
+def claim_order(order_id, designer_id, channel_id=None, status="claimed", product=None):
+    """Atomically claims an order. Returns (claimed, row); row is the existing claim if someone got there first."""
+    db = get_connection()
+    now = int(time.time())
+    cursor = db.execute(
+        "INSERT INTO orders (order_id, designer_id, channel_id, status, claimed_at, updated_at, product) VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (order_id) DO NOTHING",
+        (order_id, designer_id, channel_id, status, now, now, product),
+    )
+    return cursor.rowcount == 1, get_order(order_id)
+
+def get_order(order_id):
+    row = get_connection().execute("SELECT * FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+    return dict(row) if row else None
+
+def set_order_status(order_id, status, expected=OPEN_ORDER_STATUSES):
+    """Compare-and-set status change; returns False if the order is missing or not in an expected status."""
+    placeholders = ", ".join("?" for _ in expected)
+    cursor = get_connection().execute(
+        f"UPDATE orders SET status = ?, updated_at = ? WHERE order_id = ? AND status IN ({placeholders})",
+        (status, int(time.time()), order_id, *expected),
+    )
+    return cursor.rowcount == 1
+
+def unclaim_order(order_id, expected_status):
+    """Removes an order registered by a step that then failed (compare-and-set on its status). Returns False if it moved on."""
+    cursor = get_connection().execute("DELETE FROM orders WHERE order_id = ? AND status = ?", (order_id, expected_status))
+    return cursor.rowcount == 1
+
+def list_orders(designer_id=None, open_only=False, after=None, limit=10):
+    """Newest-first page of orders using keyset pagination; `after` is the (updated_at, order_id) of the last row seen."""
+    clauses, params = [], []
+    if designer_id is not None:
+        clauses.append("designer_id = ?")
+        params.append(designer_id)
+    if open_only:
+        # Literal list so SQLite can use the partial idx_orders_open index
+        clauses.append("status IN ('claimed', 'in_qc', 'denied')")
+    if after:
+        clauses.append("(updated_at, order_id) < (?, ?)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = get_connection().execute(
+        f"SELECT * FROM orders {where} ORDER BY updated_at DESC, order_id DESC LIMIT ?", (*params, limit)
+    ).fetchall()
+    return [dict(row) for row in rows]
+# 🔹 Designer workload (assignment engine)
+def record_qc_result(order_id, designer_id, passed):
+    get_connection().execute(
+        "INSERT INTO qc_results (order_id, designer_id, passed, decided_at) VALUES (?, ?, ?, ?)",
+        (order_id, designer_id, int(passed), int(time.time())),
+    )
+
+def designer_loads(since, designer_id=None):
+    """Returns {designer_id: {"open", "passed", "failed"}} from open orders and QC results decided after `since` (one designer, or all)."""
+    db = get_connection()
+    only = "" if designer_id is None else " AND designer_id = ?"
+    params = () if designer_id is None else (designer_id,)
+    loads = {}
+    for row in db.execute(
+        f"SELECT designer_id, COUNT(*) AS open FROM orders WHERE status IN ('claimed', 'in_qc', 'denied'){only} GROUP BY designer_id", params
+    ):
+        loads[row["designer_id"]] = {"open": row["open"], "passed": 0, "failed": 0}
+    for row in db.execute(
+        f"SELECT designer_id, SUM(passed) AS passed, COUNT(*) - SUM(passed) AS failed FROM qc_results WHERE decided_at >= ?{only} GROUP BY designer_id",
+        (since, *params),
+    ):
+        loads.setdefault(row["designer_id"], {"open": 0, "passed": 0, "failed": 0}).update(passed=row["passed"], failed=row["failed"])
+    return loads
+
+def product_ratings(designer_id=None):
+    """Returns {designer_id: {product: (count, sum)}} for every designer with reviews (or just one)."""
+    ratings = {}
+    only = "" if designer_id is None else " WHERE designer_id = ?"
+    for row in get_connection().execute(f"SELECT designer_id, product, count, sum FROM rating_totals{only}", () if designer_id is None else (designer_id,)):
+        ratings.setdefault(row["designer_id"], {})[row["product"]] = (row["count"], row["sum"])
+    return ratings
+
+# 🔹 Reviews and per-designer rating aggregates (maintained at write time)
+ALL_PRODUCTS = "All"
+RATING_WINDOW_DAYS = 30
+
+def record_review(message_id, position, designer_id, reviewer_id, product, stars, created_at):
+    """Stores a review once and updates its designer's aggregates. Returns False if it was already recorded."""
+    day = int(created_at) // 86400
+    with transaction() as db:
+        cursor = db.execute(
+            "INSERT OR IGNORE INTO reviews (message_id, position, designer_id, reviewer_id, product, stars, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (message_id, position, designer_id, reviewer_id, product, stars, int(created_at)),
+        )
+        if cursor.rowcount == 0:
+            return False
+        for key in (product, ALL_PRODUCTS):
+            db.execute(
+                f"INSERT INTO rating_totals (designer_id, product, count, sum, s{stars}) VALUES (?, ?, 1, ?, 1) "
+                f"ON CONFLICT (designer_id, product) DO UPDATE SET count = count + 1, sum = sum + excluded.sum, s{stars} = s{stars} + 1",
+                (designer_id, key, stars),
+            )
+            db.execute(
+                "INSERT INTO rating_daily (designer_id, product, day, count, sum) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT (designer_id, product, day) DO UPDATE SET count = count + 1, sum = sum + excluded.sum",
+                (designer_id, key, day, stars),
+            )
+    return True
+
+def get_ratings(designer_id):
+    """Returns {product: totals} for a designer, including a rolling 30-day count/sum per product."""
+    db = get_connection()
+    ratings = {row["product"]: dict(row, recent_count=0, recent_sum=0) for row in db.execute(
+        "SELECT * FROM rating_totals WHERE designer_id = ?", (designer_id,)
+    )}
+    since = int(time.time()) // 86400 - RATING_WINDOW_DAYS + 1
+    for row in db.execute(
+        "SELECT product, SUM(count) AS count, SUM(sum) AS sum FROM rating_daily WHERE designer_id = ? AND day >= ? GROUP BY product",
+        (designer_id, since),
+    ):
+        if row["product"] in ratings:
+            ratings[row["product"]].update(recent_count=row["count"], recent_sum=row["sum"])
+    return ratings
+
+def top_rated(product=ALL_PRODUCTS, limit=10, min_reviews=1):
+    """Top designers by average rating for a product, read straight off the average index."""
+    rows = get_connection().execute(
+        "SELECT designer_id, count, sum, sum * 1.0 / count AS average FROM rating_totals "
+        "WHERE product = ? AND count >= ? ORDER BY sum * 1.0 / count DESC LIMIT ?",
+        (product, min_reviews, limit),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+# 🔹 Exported history (full-text index over the records export.py writes)
+HISTORY_RESULTS = 10
+
+def index_history(records, checkpoint_key, checkpoint, decided_kinds=()):
+    """Indexes one exported batch and moves its checkpoint in the same transaction."""
+    with transaction() as db:
+        db.executemany(
+            "INSERT INTO history (kind, order_id, people, product, status, text, created_at, channel_id, message_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(
+                record.kind, record.order_id, " ".join(str(person) for person in (record.designer_id, record.user_id) if person),
+                record.product, record.status, record.text, record.created_at, record.channel_id, record.message_id,
+            ) for record in records],
+        )
+        # A decision settles the record of the message it was made on, if that was exported while still pending
+        db.executemany(
+            "UPDATE history SET status = ? WHERE message_id = ? AND status = 'pending'",
+            [(record.status, record.message_id) for record in records if record.kind in decided_kinds],
+        )
+        db.execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (checkpoint_key, checkpoint))
+
+def clear_history(checkpoint_key, kinds, channel_id=None):
+    """Drops indexed records of some kinds (optionally from one channel) and their checkpoint, before exporting them again."""
+    placeholders = ", ".join("?" for _ in kinds)
+    with transaction() as db:
+        if channel_id is None:
+            db.execute(f"DELETE FROM history WHERE kind IN ({placeholders})", kinds)
+        else:
+            db.execute(f"DELETE FROM history WHERE kind IN ({placeholders}) AND channel_id = ?", (*kinds, channel_id))
+        db.execute("DELETE FROM kv WHERE key = ?", (checkpoint_key,))
+
+def search_history(query, kind=None, person_id=None, limit=HISTORY_RESULTS):
+    """Best matches for free text (every word must match), optionally of one kind or involving one member."""
+    terms = ['"' + word.replace('"', '""') + '"' for word in query.split()]
+    if kind:
+        terms.append(f'kind:"{kind}"')
+    if person_id:
+        terms.append(f'people:"{person_id}"')
+    if not terms:
+        return []
+    rows = get_connection().execute(
+        "SELECT * FROM history WHERE history MATCH ? ORDER BY rank LIMIT ?", (" ".join(terms), limit)
+    ).fetchall()
+    return [dict(row) for row in rows]
\ No newline at end of file
@@ -0,0 +1,127 @@
+import asyncio
+import time
+import discord
+
+# 🔹 Join Pipeline Defaults
+WELCOME_WINDOW = 3.0  # Seconds to collect joins into one welcome message
+WELCOME_MAX_BATCH = 20  # Max members mentioned in one welcome message
+ROLE_WORKERS = 3  # Concurrent auto-role grants
+
+class JoinPipeline:
+    """Coalesces welcome messages and queues auto-roles so join spikes don't run into 429s."""
+    def __init__(self, bot, channel_id, emoji_id, role_id, window=WELCOME_WINDOW, max_batch=WELCOME_MAX_BATCH, workers=ROLE_WORKERS):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.emoji_id = emoji_id
+        self.role_id = role_id
+        self.window = window
+        self.max_batch = max_batch
+        self.workers = workers
+        self.joins = asyncio.Queue()
+        self.roles = asyncio.Queue()
+        self.channel = None
+        self.emoji = None
+        self.tasks = []
+        self.counters = {
+            "joins": 0,
+            "welcome_messages": 0,
+            "roles_granted": 0,
+            "role_failures": 0,
+            "rate_limited": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+        }
+
+    def start(self):
+        """Starts the welcome flusher and role workers (safe to call on every reconnect)."""
+        if self.tasks:
+            return
+        self.tasks.append(asyncio.create_task(self._welcome_loop()))
+        for _ in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._role_worker()))
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+
+    def enqueue(self, member):
+        """Queues a new member for the next welcome batch and an auto-role grant."""
+        now = time.perf_counter()
+        self.counters["joins"] += 1
+        self.joins.put_nowait((member, now))
+        self.roles.put_nowait(member)
+
+    def stats(self):
+        return {**self.counters, "join_queue": self.joins.qsize(), "role_queue": self.roles.qsize()}
+
+    async def get_channel(self):
+        """Resolves the welcome channel once and caches it."""
+        if self.channel is None:
+            self.channel = self.bot.get_channel(self.channel_id) or await self.bot.fetch_channel(self.channel_id)
+        return self.channel
+
+    def get_emoji_text(self):
+        # Cache the emoji once it is found (emojis may not be loaded before ready)
+        if self.emoji is None:
+            self.emoji = self.bot.get_emoji(self.emoji_id)
+        return f"{self.emoji}" if self.emoji else ""
+
+    async def _welcome_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.joins.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.joins.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        members = [member for member, _ in batch]
+        member_count = members[-1].guild.member_count
+        mentions = ", ".join(member.mention for member in members)
+        if len(members) == 1:
+            text = f"{self.get_emoji_text()} Welcome {mentions} to Switch Customs. You are member {member_count}"
+        else:
+            text = f"{self.get_emoji_text()} Welcome {mentions} to Switch Customs. You are members {member_count - len(members) + 1}-{member_count}"
+
+        try:
+            channel = await self.get_channel()
+            await channel.send(text)
+            self.counters["welcome_messages"] += 1
+        except Exception as e:
+            print(f"❌ Failed to send welcome message: {e}")
+
+        # Flush latency = time the oldest join in the batch waited for its welcome
+        flush_ms = (time.perf_counter() - batch[0][1]) * 1000
+        self.counters["last_flush_ms"] = flush_ms
+        self.counters["max_flush_ms"] = max(self.counters["max_flush_ms"], flush_ms)
+
+    async def _role_worker(self):
+        while True:
+            member = await self.roles.get()
+            try:
+                role = member.guild.get_role(self.role_id)
+                if role:
+                    await member.add_roles(role)
+                    self.counters["roles_granted"] += 1
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    # discord.py retries bucket limits itself; this only triggers on global/cloudflare limits
+                    self.counters["rate_limited"] += 1
+                    await asyncio.sleep(getattr(e, "retry_after", 1.0) or 1.0)
+                    self.roles.put_nowait(member)
+                else:
+                    self.counters["role_failures"] += 1
+                    print(f"❌ Failed to assign auto-role: {e}")
+            except Exception as e:
+                self.counters["role_failures"] += 1
+                print(f"❌ Failed to assign auto-role: {e}")
+            finally:
+                self.roles.task_done()
\ No newline at end of file